@@ -4,22 +4,31 @@ from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk import Action
 
-from actions.db import get_contacts
+from actions.action_cache import amemoized
+from actions.db import CONTACTS, aget_contacts
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class AskForRemoveContactHandle(Action):
     def name(self) -> Text:
         return "action_ask_remove_contact_handle"
 
-    def run(
+    async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict
     ):
-        contacts = get_contacts(tracker.sender_id)
+        async def contact_handles():
+            contacts = await aget_contacts(tracker.sender_id)
+            return tuple((c.handle, c.name) for c in contacts)
+
+        handles = await amemoized(
+            self.name(), tracker.sender_id, [CONTACTS], (), contact_handles
+        )
 
         dispatcher.utter_message(
             text="What's the handle of the user you want to remove?",
             buttons=[
-                {"title": f"{c.handle} ({c.name})", "payload": c.handle}
-                for c in contacts
+                {"title": f"{handle} ({name})", "payload": handle}
+                for handle, name in handles
             ]
         )
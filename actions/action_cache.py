@@ -0,0 +1,130 @@
+"""Memoized results of the actions that only read session data.
+
+Actions like `check_balance` or `list_contacts` compute the same result
+again and again until a write action changes the session. Their results are
+kept in a bounded LRU cache keyed by the action, the session, the version
+of the session tables the action reads (see `get_session_version` in
+`actions/db.py`) and the values of the slots the result depends on. Repeated
+turns are answered from the cache without reading or decoding the storage.
+
+Cached results are shared and must be immutable, e.g. strings, numbers or
+tuples.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from actions.db import get_session_version, run_in_db_executor
+from actions.instrumentation import register_cache
+
+ACTION_CACHE_MAX_ENTRIES = int(os.environ.get("ACTION_CACHE_MAX_ENTRIES", 4096))
+
+_NOT_FOUND = object()
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache with hit counters.
+
+    Holds the action results here and the parsed dates of
+    `actions/datetime_parsing.py`.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value, `default` on a miss."""
+        with self._lock:
+            value = self._entries.get(key, _NOT_FOUND)
+            if value is _NOT_FOUND:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+action_cache = LRUCache(ACTION_CACHE_MAX_ENTRIES)
+register_cache("action", action_cache.stats)
+
+
+def result_key(
+    action: str, session_id: str, dbs: Iterable[str], slots: Tuple[Any, ...] = ()
+) -> Optional[Hashable]:
+    """Returns the cache key of an action result, `None` if it must not be cached."""
+    version = get_session_version(session_id, dbs)
+    if version is None:
+        return None
+    return action, session_id, version, slots
+
+
+def memoized(
+    action: str,
+    session_id: str,
+    dbs: Iterable[str],
+    slots: Tuple[Any, ...],
+    compute: Callable[[], Any],
+) -> Any:
+    """Returns the cached result of an action or computes and caches it."""
+    key = result_key(action, session_id, dbs, slots)
+    if key is None:
+        return compute()
+    result = action_cache.get(key, _NOT_FOUND)
+    if result is _NOT_FOUND:
+        result = compute()
+        action_cache.put(key, result)
+    return result
+
+
+async def amemoized(
+    action: str,
+    session_id: str,
+    dbs: Iterable[str],
+    slots: Tuple[Any, ...],
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Like `memoized`, for results computed by a coroutine.
+
+    The version lookup reads and touches the storage, it runs in the db
+    executor like the other blocking storage calls.
+    """
+    key = await run_in_db_executor(result_key, action, session_id, list(dbs), slots)
+    if key is None:
+        return await compute()
+    result = action_cache.get(key, _NOT_FOUND)
+    if result is _NOT_FOUND:
+        result = await compute()
+        action_cache.put(key, result)
+    return result
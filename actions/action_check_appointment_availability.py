@@ -1,28 +1,38 @@
+import calendar as calendar_module
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List
 
-from rasa.shared.nlu.training_data.message import Message
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.setup_recurrent_payment import parse_datetime
+from actions.availability import SlotCalendar, opening_hours
+from actions.datetime_parsing import parse_datetime
+from actions.instrumentation import instrumented
+
+
+# doctor has clinics only on Monday to Friday, between 9am and 5pm,
+# excluding noon in-patient checks
+APPOINTMENT_CALENDAR = SlotCalendar([
+    opening_hours(range(5), 9, 12),
+    opening_hours(range(5), 14, 17),
+])
 
 
 def is_appointment_available(appointment_time: datetime) -> bool:
-    weekday = appointment_time.weekday()
-    # doctor has clinics only on Monday to Friday (0 to 4)
-    if weekday in [5, 6]:
-        return False
+    return APPOINTMENT_CALENDAR.is_available(appointment_time)
 
-    hour = appointment_time.hour
 
-    # doctor is available only between 9am to 5pm, excluding noon in-patient checks
-    if hour < 9 or hour > 17 or 12 <= hour < 14:
-        return False
+def format_weekly_slots(calendar: SlotCalendar) -> List[str]:
+    return [
+        f"{calendar_module.day_name[weekday]} {start.hour}:{start.minute:02d}"
+        for weekday, start in calendar.weekly_slots()
+    ]
 
-    return True
 
+AVAILABLE_APPOINTMENTS = format_weekly_slots(APPOINTMENT_CALENDAR)
 
+
+@instrumented
 class AppointmentSearch(Action):
 
     def name(self) -> str:
@@ -35,17 +45,7 @@ class AppointmentSearch(Action):
             return []
 
         appointment_time = parse_datetime(current_value)
-        available_appointments = [
-            "Monday 9:00", "Monday 10:00", "Monday 11:00", "Monday 14:00",
-            "Monday 15:00", "Monday 16:00", "Tuesday 9:00", "Tuesday 10:00",
-            "Tuesday 11:00", "Tuesday 14:00", "Tuesday 15:00", "Tuesday 16:00",
-            "Wednesday 9:00", "Wednesday 10:00", "Wednesday 11:00", "Wednesday 14:00",
-            "Wednesday 15:00", "Wednesday 16:00", "Thursday 9:00", "Thursday 10:00",
-            "Thursday 11:00", "Thursday 14:00", "Thursday 15:00", "Thursday 16:00",
-            "Friday 9:00", "Friday 10:00", "Friday 11:00", "Friday 14:00",
-            "Friday 15:00", "Friday 16:00"
-        ]
         return [
-            SlotSet("available_appointments", available_appointments),
+            SlotSet("available_appointments", AVAILABLE_APPOINTMENTS),
             SlotSet("appointment_available", is_appointment_available(appointment_time))
         ]
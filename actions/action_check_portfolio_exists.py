@@ -3,8 +3,10 @@ from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 
 from actions.db import get_portfolio_options
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ActionCheckPortfolioExists(Action):
 
     def name(self) -> str:
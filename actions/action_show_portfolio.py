@@ -2,9 +2,12 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 
-from actions.db import get_portfolio_options
+from actions.action_cache import memoized
+from actions.db import PORTFOLIO_OPTIONS, get_portfolio_options
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ActionShowPortfolio(Action):
 
     def name(self) -> str:
@@ -15,12 +18,15 @@ class ActionShowPortfolio(Action):
         # Retrieve the portfolio type from slots
         portfolio_type = tracker.get_slot("portfolio_type")
 
-        # Placeholder for portfolio data
-        portfolio_db = get_portfolio_options(tracker.sender_id)
+        def portfolio_options() -> tuple:
+            # Placeholder for portfolio data
+            portfolio_db = get_portfolio_options(tracker.sender_id)
 
-        portfolio = [p.options for p in portfolio_db if p.type == portfolio_type]
+            portfolio = [p.options for p in portfolio_db if p.type == portfolio_type]
+            return tuple(portfolio[0]) if portfolio else ()
 
-        if portfolio:
-            return [SlotSet("portfolio_options", portfolio[0])]
-        else:
-            return [SlotSet("portfolio_options", [])]
\ No newline at end of file
+        options = memoized(
+            self.name(), tracker.sender_id, [PORTFOLIO_OPTIONS], (portfolio_type,),
+            portfolio_options,
+        )
+        return [SlotSet("portfolio_options", list(options))]
\ No newline at end of file
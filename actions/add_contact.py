@@ -2,27 +2,40 @@ from typing import Any, Dict
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_contacts, add_contact, Contact
+from actions.db import (
+    get_contacts, add_contact, run_in_db_executor, session_transaction, Contact
+)
+from actions.instrumentation import instrumented
 
 
+def add_new_contact(session_id: str, name: str, handle: str) -> str:
+    with session_transaction(session_id):
+        contacts = get_contacts(session_id)
+        existing_handles = {c.handle for c in contacts}
+        if handle in existing_handles:
+            return "already_exists"
+
+        new_contact = Contact(name=name, handle=handle)
+        add_contact(session_id, new_contact)
+    return "success"
+
+
+@instrumented
 class AddContact(Action):
 
     def name(self) -> str:
         return "add_contact"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker, domain: Dict[str, Any]):
-        contacts = get_contacts(tracker.sender_id)
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker, domain: Dict[str, Any]):
         name = tracker.get_slot("add_contact_name")
         handle = tracker.get_slot("add_contact_handle")
 
         if name is None or handle is None:
             return [SlotSet("return_value", "data_not_present")]
 
-        existing_handles = {c.handle for c in contacts}
-        if handle in existing_handles:
-            return [SlotSet("return_value", "already_exists")]
-
-        new_contact = Contact(name=name, handle=handle)
-        add_contact(tracker.sender_id, new_contact)
-        return [SlotSet("return_value", "success")]
+        # the whole read-modify-write runs as one call on a storage thread
+        return_value = await run_in_db_executor(
+            add_new_contact, tracker.sender_id, name, handle
+        )
+        return [SlotSet("return_value", return_value)]
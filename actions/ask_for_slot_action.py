@@ -4,9 +4,11 @@ from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk import Action
 
-from actions.db import get_restaurants
+from actions.restaurant_catalog import get_restaurant_catalog
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class AskForRestaurantFormCuisine(Action):
     def name(self) -> Text:
         return "action_ask_restaurant_form_cuisine"
@@ -14,12 +16,7 @@ class AskForRestaurantFormCuisine(Action):
     def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict
     ):
-        restaurants = get_restaurants(tracker.sender_id)
-        cuisine_list = set([
-            r.cuisine
-            for r in restaurants
-            if r.city.lower() == tracker.get_slot("city").lower()
-        ])
+        cuisine_list = get_restaurant_catalog().cuisines_in(tracker.get_slot("city"))
 
         dispatcher.utter_message(
             text="What cuisine are you looking for?",
@@ -30,6 +27,7 @@ class AskForRestaurantFormCuisine(Action):
         )
 
 
+@instrumented
 class AskForRestaurantFormRestaurantName(Action):
     def name(self) -> Text:
         return "action_ask_restaurant_form_restaurant_name"
@@ -37,13 +35,9 @@ class AskForRestaurantFormRestaurantName(Action):
     def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict
     ):
-        restaurants = get_restaurants(tracker.sender_id)
-
-        restaurant_names = set([
-            r.name for r in restaurants
-            if r.city.lower() == tracker.get_slot("city").lower() and
-            r.cuisine.lower() == tracker.get_slot("cuisine").lower()
-        ])
+        restaurant_names = get_restaurant_catalog().restaurant_names(
+            tracker.get_slot("city"), tracker.get_slot("cuisine")
+        )
 
         if len(restaurant_names) > 0:
             dispatcher.utter_message(
@@ -1,8 +1,10 @@
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ActionAuthenticateUser(Action):
 
     def name(self) -> str:
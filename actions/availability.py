@@ -0,0 +1,140 @@
+"""Availability engine shared by the appointment and restaurant booking actions.
+
+Opening hours are compiled into a weekly calendar, a sorted tuple of slot
+start offsets from Monday 00:00. Checking a point in time and finding the
+next free slots are bisections into that tuple, independent of how far in
+the future the query is. Providers with the same opening hours share one
+compiled calendar, so thousands of providers cost one dictionary entry each.
+"""
+
+import bisect
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import (
+    Collection, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+)
+
+
+@dataclass(frozen=True)
+class OpeningHours:
+    """Opening hours on the given weekdays (0 is Monday), `end` is exclusive."""
+
+    weekdays: FrozenSet[int]
+    start: time
+    end: time
+
+
+def opening_hours(
+    weekdays: Iterable[int], start_hour: int, end_hour: int
+) -> OpeningHours:
+    end = time.max if end_hour == 24 else time(end_hour)
+    return OpeningHours(frozenset(weekdays), time(start_hour), end)
+
+
+def _seconds(value: time) -> int:
+    if value == time.max:
+        return 24 * 60 * 60
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _week_start(value: datetime) -> datetime:
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=value.weekday())
+
+
+class SlotCalendar:
+    """A weekly recurring calendar of bookable slots of a fixed length."""
+
+    def __init__(
+        self, hours: Iterable[OpeningHours], slot_length: timedelta = timedelta(hours=1)
+    ) -> None:
+        self.slot_seconds = int(slot_length.total_seconds())
+        starts = set()
+        for rule in hours:
+            for weekday in rule.weekdays:
+                start = weekday * 86400 + _seconds(rule.start)
+                end = weekday * 86400 + _seconds(rule.end)
+                starts.update(
+                    range(start, end - self.slot_seconds + 1, self.slot_seconds)
+                )
+        self.starts: Tuple[int, ...] = tuple(sorted(starts))
+
+    def slot_at(self, value: datetime) -> Optional[datetime]:
+        """Returns the start of the slot containing `value`, if there is one."""
+        week_start = _week_start(value)
+        offset = (value - week_start).total_seconds()
+        index = bisect.bisect_right(self.starts, offset) - 1
+        if index < 0 or offset >= self.starts[index] + self.slot_seconds:
+            return None
+        return week_start + timedelta(seconds=self.starts[index])
+
+    def is_available(self, value: datetime) -> bool:
+        return self.slot_at(value) is not None
+
+    def next_slots(
+        self,
+        after: datetime,
+        count: int = 1,
+        exclude: Collection[float] = (),
+        until: Optional[datetime] = None,
+    ) -> List[datetime]:
+        """Returns the starts of the next `count` slots starting at or after `after`.
+
+        `exclude` holds the timestamps of slot starts to skip, for example
+        the ones already offered to the user.
+        """
+        if not self.starts:
+            return []
+        week_start = _week_start(after)
+        index = bisect.bisect_left(self.starts, (after - week_start).total_seconds())
+        result = []
+        # every week has at least one slot, skipping all excluded ones is bounded
+        for _ in range(len(exclude) + count):
+            if index == len(self.starts):
+                week_start += timedelta(days=7)
+                index = 0
+            slot = week_start + timedelta(seconds=self.starts[index])
+            index += 1
+            if until is not None and slot > until:
+                break
+            if slot.timestamp() in exclude:
+                continue
+            result.append(slot)
+            if len(result) == count:
+                break
+        return result
+
+    def weekly_slots(self) -> List[Tuple[int, time]]:
+        """Returns the weekday and start time of every slot of a week."""
+        return [
+            (start // 86400, (datetime.min + timedelta(seconds=start % 86400)).time())
+            for start in self.starts
+        ]
+
+
+class AvailabilityEngine:
+    """Calendars of many providers, compiled once per distinct set of opening hours."""
+
+    def __init__(
+        self,
+        default_hours: Iterable[OpeningHours] = (),
+        slot_length: timedelta = timedelta(hours=1),
+    ) -> None:
+        self.slot_length = slot_length
+        self._compiled: Dict[Hashable, SlotCalendar] = {}
+        self._providers: Dict[Hashable, SlotCalendar] = {}
+        self.default = self._compile(default_hours)
+
+    def _compile(self, hours: Iterable[OpeningHours]) -> SlotCalendar:
+        key = frozenset(hours)
+        calendar = self._compiled.get(key)
+        if calendar is None:
+            calendar = SlotCalendar(key, self.slot_length)
+            self._compiled[key] = calendar
+        return calendar
+
+    def register(self, provider: Hashable, hours: Iterable[OpeningHours]) -> None:
+        self._providers[provider] = self._compile(hours)
+
+    def calendar(self, provider: Hashable) -> SlotCalendar:
+        return self._providers.get(provider, self.default)
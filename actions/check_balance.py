@@ -2,15 +2,21 @@ from typing import Any, Dict
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_account
+from actions.action_cache import amemoized
+from actions.db import BALANCE, aget_balance
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class CheckBalance(Action):
 
     def name(self) -> str:
         return "check_balance"
 
-    def run(self, dispatcher: CollectingDispatcher,
+    async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker, domain: Dict[str, Any]):
-        account = get_account(tracker.sender_id)
-        return [SlotSet("current_balance", account.funds)]
+        balance = await amemoized(
+            self.name(), tracker.sender_id, [BALANCE], (),
+            lambda: aget_balance(tracker.sender_id),
+        )
+        return [SlotSet("current_balance", balance)]
@@ -1,15 +1,56 @@
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from rasa.shared.nlu.training_data.message import Message
 from rasa_sdk.events import EventType, SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.interfaces import Action, Tracker
 from rasa_sdk.types import DomainDict
 
-from actions.entity_extractor import duckling_entity_extractor
+from actions.availability import AvailabilityEngine, SlotCalendar, opening_hours
+from actions.datetime_parsing import aparse_datetimes
+from actions.db import run_in_db_executor
+from actions.reservations import (
+    RESERVATION_DURATION, get_reservation_ledger, parse_party_size
+)
+from actions.instrumentation import instrumented
 
+# Monday to Thursday available after 8pm,
+# Friday to Sunday available 4-6pm and 8-11pm
+restaurant_calendars = AvailabilityEngine([
+    opening_hours(range(4), 20, 24),
+    opening_hours(range(4, 7), 16, 18),
+    opening_hours(range(4, 7), 20, 23),
+])
+# alternatives are offered from one hour before up to two days after the request
+ALTERNATIVE_EARLIEST = timedelta(hours=1)
+ALTERNATIVE_LATEST = timedelta(days=2)
+# free slots checked for capacity before offering a different restaurant
+ALTERNATIVE_CANDIDATES = 16
 
+
+async def requested_table(tracker: Tracker) -> Tuple[str, Optional[datetime], int]:
+    """Returns the restaurant, date and party size of the booking slots.
+
+    The date is `None` if the date or the time could not be parsed, e.g.
+    because Duckling did not answer within its latency budget.
+    """
+    # both values are parsed concurrently
+    booking_time, booking_date = await aparse_datetimes(
+        tracker.slots.get("book_restaurant_time"),
+        tracker.slots.get("book_restaurant_date"),
+    )
+    if booking_time is None or booking_date is None:
+        date = None
+    else:
+        date = datetime.combine(booking_date.date(), booking_time.time())
+    return (
+        tracker.slots.get("book_restaurant_name_of_restaurant"),
+        date,
+        parse_party_size(tracker.slots.get("book_restaurant_number_of_people")),
+    )
+
+
+@instrumented
 class CheckRestaurantAvailability(Action):
 
     def name(self) -> str:
@@ -38,29 +79,10 @@ class CheckRestaurantAvailability(Action):
                 returned through the endpoint
         """
 
-        def parse_datetime(text: str) -> Optional[datetime]:
-            msg = Message.build(text)
-            duckling_entity_extractor.process([msg])
-            if len(msg.data["entities"]) == 0:
-                return None
-            parsed_value = msg.data["entities"][0]["value"]
-            if isinstance(parsed_value, dict):
-                parsed_value = parsed_value["from"]
-            return datetime.fromisoformat(parsed_value)
-
-        def is_restaurant_available(date: datetime) -> bool:
-            # monday to thursday available after 7pm
-            if date.weekday() < 4:
-                return date.hour > 19
-            # Friday to Sunday available 4-5pm and 8-10pm
-            else:
-                return 16 <= date.hour <= 17 or 20 <= date.hour <= 22
-
         def get_alternative_restaurant() -> str:
             return "Prometheus Pizza"
 
-        def alternative_date_to_string(original_date: datetime,
-                                       alternative_date: datetime) -> str:
+        def alternative_date_to_string(alternative_date: datetime) -> str:
             fmt = "%I%p"
             today = datetime.now()
             tomorrow = today + timedelta(days=1)
@@ -73,45 +95,58 @@ class CheckRestaurantAvailability(Action):
             return alternative_date.strftime(fmt).replace("0", "")
 
         def find_alternative_date(
+                calendar: SlotCalendar,
                 original_date: datetime,
                 previously_offered_alternatives: List[str]
-        ) -> Optional[str]:
-            deltas = [timedelta(hours=-1), timedelta(hours=1), timedelta(hours=2),
-                      timedelta(days=1), timedelta(days=2)]
-            date_with_deltas = [original_date + delta for delta in deltas]
-            available_dates = [alternative_date
-                               for alternative_date in date_with_deltas
-                               if is_restaurant_available(alternative_date)]
-            available_dates_str = [alternative_date_to_string(original_date,
-                                                              available_date)
-                                   for available_date in available_dates]
-            not_offered_before = [available_date
-                                  for available_date in available_dates_str
-                                  if available_date not in
-                                  previously_offered_alternatives]
-            if len(not_offered_before) > 0:
-                return not_offered_before[0]
-            else:
-                return None
+        ) -> Optional[datetime]:
+            # alternatives are stored as the ISO timestamps of their slots
+            offered = set()
+            for alternative in previously_offered_alternatives:
+                try:
+                    offered.add(datetime.fromisoformat(alternative).timestamp())
+                except ValueError:
+                    continue
+            available_dates = calendar.next_slots(
+                original_date - ALTERNATIVE_EARLIEST,
+                count=ALTERNATIVE_CANDIDATES,
+                exclude=offered,
+                until=original_date + ALTERNATIVE_LATEST,
+            )
+            for available_date in available_dates:
+                if ledger.has_capacity(restaurant_name, available_date,
+                                       available_date + RESERVATION_DURATION,
+                                       party_size, tracker.sender_id):
+                    return available_date
+            return None
 
-        restaurant_name = tracker.slots.get("book_restaurant_name_of_restaurant")
-        number_of_people = tracker.slots.get("book_restaurant_number_of_people")
+        restaurant_name, date, party_size = await requested_table(tracker)
         is_date_flexible = tracker.slots.get("book_restaurant_is_date_flexible")
-        booking_time = parse_datetime(tracker.slots.get("book_restaurant_time"))
-        booking_date = parse_datetime(tracker.slots.get("book_restaurant_date"))
         previously_offered_alternatives = \
-            tracker.slots.get("book_restaurant_offered_alternative_dates")
-        date = datetime.combine(booking_date.date(), booking_time.time())
+            tracker.slots.get("book_restaurant_offered_alternative_dates") or []
 
-        if is_restaurant_available(date) or \
-                restaurant_name == get_alternative_restaurant():
+        if restaurant_name == get_alternative_restaurant():
             return [SlotSet("is_restaurant_available", True)]
-        alternative_time = find_alternative_date(date,
-                                                 previously_offered_alternatives)
+
+        calendar = restaurant_calendars.calendar(restaurant_name)
+        ledger = get_reservation_ledger()
+        if date is None:
+            # no date to check, only the alternative restaurant can be offered
+            alternative_date = None
+        elif calendar.is_available(date) and await run_in_db_executor(
+            ledger.has_capacity, restaurant_name, date, date + RESERVATION_DURATION,
+            party_size, tracker.sender_id,
+        ):
+            # only checks the capacity, the table is booked by
+            # `reserve_restaurant` once the user confirmed the booking
+            return [SlotSet("is_restaurant_available", True)]
+        else:
+            alternative_date = await run_in_db_executor(
+                find_alternative_date, calendar, date, previously_offered_alternatives
+            )
         if is_date_flexible and is_date_flexible != "False" \
-                and alternative_time is not None:
-            alternative = alternative_time
-            previously_offered_alternatives.append(alternative)
+                and alternative_date is not None:
+            alternative = alternative_date_to_string(alternative_date)
+            previously_offered_alternatives.append(alternative_date.isoformat())
             has_alternative_restaurant = False
         else:
             alternative = get_alternative_restaurant()
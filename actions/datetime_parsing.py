@@ -0,0 +1,171 @@
+"""Shared parsing of date and time values, used by the actions of several flows.
+
+Values that are not ISO strings are first parsed by the local parser of
+`actions/local_datetime_parser.py`. Everything else is resolved by Duckling,
+which is an HTTP round trip. The same expressions ("tomorrow", "next monday")
+are sent by many users, so the results are kept in a bounded LRU cache. Duckling
+resolves relative expressions against the current date in its configured
+timezone, which is therefore part of the cache key. Expressions relative to
+the current time of day ("in 2 hours", "now") are never cached.
+
+Async actions use `aparse_datetime` and `aparse_datetimes`, which call
+Duckling through the pooled client of `actions/duckling_client.py`.
+"""
+
+import asyncio
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from actions.action_cache import LRUCache
+from actions.duckling_client import duckling_client, to_entity
+from actions.entity_extractor import duckling_config, get_duckling_entity_extractor
+from actions.instrumentation import external_call, register_cache
+from actions.local_datetime_parser import parse_local_datetime
+
+DATETIME_CACHE_MAX_ENTRIES = int(os.environ.get("DATETIME_CACHE_MAX_ENTRIES", 4096))
+
+# expressions whose result changes within a day
+TIME_OF_DAY_RELATIVE = re.compile(
+    r"\b(now|ago|later|in\s+\w+\s+\w+|hours?|minutes?|mins?|seconds?|secs?)\b",
+    re.IGNORECASE,
+)
+
+_NOT_FOUND = object()
+
+
+datetime_cache = LRUCache(DATETIME_CACHE_MAX_ENTRIES)
+register_cache("datetime", datetime_cache.stats)
+
+
+def get_datetime_cache_stats() -> Dict[str, float]:
+    return datetime_cache.stats()
+
+
+def _duckling_timezone() -> Optional[str]:
+    return duckling_config.get("timezone")
+
+
+def _reference_date(timezone: Optional[str]) -> date:
+    if timezone is None:
+        return date.today()
+    return datetime.now(ZoneInfo(timezone)).date()
+
+
+def reference_time() -> datetime:
+    """Returns the current time in the timezone Duckling resolves values in."""
+    timezone = _duckling_timezone()
+    if timezone is None:
+        return datetime.now().astimezone()
+    return datetime.now(ZoneInfo(timezone))
+
+
+def cache_key(text: str) -> Optional[Tuple[str, date, Optional[str]]]:
+    """Returns the cache key of an expression, `None` if it must not be cached."""
+    if TIME_OF_DAY_RELATIVE.search(text):
+        return None
+    timezone = _duckling_timezone()
+    return text.strip().lower(), _reference_date(timezone), timezone
+
+
+def parse_entity(entity: Dict[str, Any]) -> datetime:
+    parsed_value = entity["value"]
+    if isinstance(parsed_value, dict):
+        parsed_value = parsed_value.get("from") or parsed_value["to"]
+
+    result = datetime.fromisoformat(parsed_value)
+    return result.replace(tzinfo=None)
+
+
+def duckling_entity(
+    text: str, reference: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    # Rasa is only imported by the processes that actually call Duckling
+    from rasa.shared.nlu.training_data.message import Message
+
+    msg = Message.build(text)
+    if reference is not None:
+        # resolved relative to `reference` instead of the current time
+        msg.time = int(reference.timestamp())
+    extractor = get_duckling_entity_extractor()
+    with external_call("duckling"):
+        extractor.process([msg])
+    if len(msg.data.get("entities", [])) == 0:
+        return None
+    return msg.data["entities"][0]
+
+
+def parse_with_duckling(text: str) -> Optional[datetime]:
+    entity = duckling_entity(text)
+    return parse_entity(entity) if entity is not None else None
+
+
+def parse_datetime(text: str) -> Optional[datetime]:
+    # If the text is already a date slot value extracted from Duckling,
+    # we can just use it
+    try:
+        result = datetime.fromisoformat(text)
+        return result.replace(tzinfo=None)
+    except ValueError:
+        pass
+
+    # Common expressions are parsed locally
+    entity = parse_local_datetime(text, reference_time())
+    if entity is not None:
+        return parse_entity(entity)
+
+    # Otherwise, we need to parse the value set by the LLM
+    # using Duckling
+    key = cache_key(text)
+    if key is None:
+        return parse_with_duckling(text)
+    result = datetime_cache.get(key, _NOT_FOUND)
+    if result is _NOT_FOUND:
+        result = parse_with_duckling(text)
+        # the extractor returns no entities when Duckling is unreachable or
+        # times out, so failures are not cached
+        if result is not None:
+            datetime_cache.put(key, result)
+    return result
+
+
+def _parse_locally(text: str) -> object:
+    """Parses a text without Duckling, `_NOT_FOUND` if Duckling is required."""
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        pass
+    entity = parse_local_datetime(text, reference_time())
+    if entity is not None:
+        return parse_entity(entity)
+    key = cache_key(text)
+    return datetime_cache.get(key, _NOT_FOUND) if key is not None else _NOT_FOUND
+
+
+async def aparse_datetime(
+    text: str, budget: Optional[float] = None
+) -> Optional[datetime]:
+    """Parses a text like `parse_datetime`, calling Duckling asynchronously.
+
+    `None` is returned if Duckling does not answer within the latency budget.
+    """
+    result = _parse_locally(text)
+    if result is not _NOT_FOUND:
+        return result
+
+    matches = await duckling_client.parse(text, budget)
+    result = parse_entity(to_entity(matches[0])) if matches else None
+    key = cache_key(text)
+    if key is not None and matches:
+        # failures are not cached, they may have been timeouts
+        datetime_cache.put(key, result)
+    return result
+
+
+async def aparse_datetimes(
+    *texts: str, budget: Optional[float] = None
+) -> List[Optional[datetime]]:
+    """Parses several texts concurrently within one latency budget."""
+    return list(await asyncio.gather(*(aparse_datetime(t, budget) for t in texts)))
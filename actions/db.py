@@ -1,23 +1,67 @@
-import tempfile
+import asyncio
+import bisect
+import copy
+import functools
+import heapq
+import itertools
 import os
-import shutil
-from typing import Any, List
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple,
+    Union,
+)
 from pydantic import BaseModel
 
-from rasa.nlu.utils import write_json_to_file
-from rasa.shared.utils.io import read_json_file
-
-ORIGIN_DB_PATH = "db"
-CONTACTS = "contacts.json"
-TRANSACTIONS = "transactions.json"
-MY_ACCOUNT = "my_account.json"
-RESTAURANTS = "restaurants.json"
-PORTFOLIO_OPTIONS = "portfolio_options.json"
+from actions import records
+from actions.instrumentation import (
+    DB_OPERATION_DURATION,
+    record_db_bytes,
+    register_cache,
+    timed,
+)
+from actions.reservations import compact_reservations
+from actions.session_janitor import SessionJanitor
+from actions.storage import (
+    BALANCE,
+    BALANCE_SNAPSHOTS,
+    CONTACTS,
+    MY_ACCOUNT,
+    ORIGIN_DB_PATH,
+    PORTFOLIO_OPTIONS,
+    READ_ONLY_DBS,
+    RESTAURANTS,
+    TRANSACTIONS,
+    JsonSessionStore,
+    SessionStore,
+    create_session_store,
+    estimate_size,
+    get_seed,
+)
+
+DB_CACHE_MAX_SESSIONS = int(os.environ.get("DB_CACHE_MAX_SESSIONS", 1024))
+DB_CACHE_MAX_BYTES = int(os.environ.get("DB_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# check cached tables against the store on every read, required as soon as
+# more than one worker serves the same sessions
+DB_CACHE_VALIDATE = os.environ.get("DB_CACHE_VALIDATE", "true").lower() == "true"
+# return the slotted records of `actions/records.py` instead of pydantic models
+DB_COMPACT_RECORDS = os.environ.get("DB_COMPACT_RECORDS", "false").lower() == "true"
+# number of transactions between two stored snapshots of the account balance
+DB_BALANCE_SNAPSHOT_INTERVAL = int(os.environ.get("DB_BALANCE_SNAPSHOT_INTERVAL", 100))
+# number of threads running the blocking storage calls of the async helpers
+DB_EXECUTOR_MAX_WORKERS = int(os.environ.get("DB_EXECUTOR_MAX_WORKERS", 8))
+# how often reads mark a session as recently accessed in the store
+DB_SESSION_TOUCH_INTERVAL_SECONDS = 60
 
 
 class MyAccount(BaseModel):
     account: str
-    funds: int
+    funds: Union[int, float]
 
 
 class Transaction(BaseModel):
@@ -50,58 +94,600 @@ class Portfolio(BaseModel):
     options: List[str]
 
 
-def get_session_db_path(session_id: str) -> str:
-    tempdir = tempfile.gettempdir()
-    project_name = "rasa-calm-demo"
-    return os.path.join(tempdir, project_name, session_id)
+class SessionCache:
+    """In-process LRU cache of parsed db files, keyed by `(session_id, db)`.
+
+    Entries are grouped per session so that eviction drops a whole session at
+    once. The cache is bounded both by the number of sessions and by the total
+    size of the cached files in bytes. Cached values are shared and must be
+    treated as read-only by callers.
+
+    Every entry remembers the stamp of the stored table it was read from. A
+    lookup only hits if the stamp still matches, which keeps the cache correct
+    when other workers write to the same session.
+    """
+
+    def __init__(self, max_sessions: int, max_bytes: int) -> None:
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, Dict[str, Tuple[Any, int, Any]]]" = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, db: str, stamp: Any = None) -> Optional[Any]:
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            entry = entries.get(db) if entries is not None else None
+            if entry is None or entry[2] != stamp:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self, session_id: str, db: str, data: Any, size: int, stamp: Any = None
+    ) -> None:
+        if self.max_sessions <= 0 or size > self.max_bytes:
+            self.invalidate(session_id, db)
+            return
+        with self._lock:
+            entries = self._sessions.setdefault(session_id, {})
+            previous = entries.get(db)
+            if previous is not None:
+                self._size -= previous[1]
+            entries[db] = (data, size, stamp)
+            self._size += size
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def extend(
+        self,
+        session_id: str,
+        db: str,
+        items: List[Any],
+        size: int,
+        previous_stamp: Any = None,
+        stamp: Any = None,
+    ) -> None:
+        """Appends rows to a cached table, if it is cached and up to date."""
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            entry = entries.get(db) if entries is not None else None
+            if entry is None:
+                return
+            data, previous_size, cached_stamp = entry
+            if cached_stamp != previous_stamp:
+                del entries[db]
+                self._size -= previous_size
+                return
+            # a new list, readers may still hold the cached one
+            entries[db] = (data + items, previous_size + size, stamp)
+            self._size += size
+            self._evict()
+
+    def invalidate(self, session_id: str, db: Optional[str] = None) -> None:
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            if entries is None:
+                return
+            if db is None:
+                self._size -= sum(entry[1] for entry in entries.values())
+                del self._sessions[session_id]
+                return
+            previous = entries.pop(db, None)
+            if previous is not None:
+                self._size -= previous[1]
+            if not entries:
+                del self._sessions[session_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sessions": len(self._sessions),
+                "bytes": self._size,
+            }
+
+    def _evict(self) -> None:
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._size > self.max_bytes
+        ):
+            _, entries = self._sessions.popitem(last=False)
+            self._size -= sum(entry[1] for entry in entries.values())
+            self.evictions += 1
+
+
+class SessionVersions:
+    """Per-session counters that change whenever this process writes a session.
+
+    Versions are drawn from one process-wide counter. Only the most recently
+    written sessions are remembered, a forgotten session gets a version newer
+    than all versions handed out before, so a version is never reused for
+    different data of the same session.
+    """
+
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions = max_sessions
+        self._counter = itertools.count(1)
+        self._floor = 0
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> int:
+        with self._lock:
+            return self._versions.get(session_id, self._floor)
+
+    def bump(self, session_id: str) -> None:
+        with self._lock:
+            self._versions[session_id] = next(self._counter)
+            self._versions.move_to_end(session_id)
+            if len(self._versions) > self.max_sessions:
+                self._versions.popitem(last=False)
+                self._floor = next(self._counter)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._floor = next(self._counter)
+
+
+session_cache = SessionCache(DB_CACHE_MAX_SESSIONS, DB_CACHE_MAX_BYTES)
+register_cache("session", session_cache.stats)
+session_versions = SessionVersions(10_000)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return session_cache.stats()
+
+
+_session_store: Optional[SessionStore] = None
+
+
+_last_touched: Dict[str, float] = {}
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = create_session_store()
+        session_janitor.start()
+    return _session_store
+
+
+def _record_access(store: SessionStore, session_id: str) -> None:
+    now = time.time()
+    if now - _last_touched.get(session_id, 0.0) < DB_SESSION_TOUCH_INTERVAL_SECONDS:
+        return
+    if len(_last_touched) > 10_000:
+        for touched_session_id, touched in list(_last_touched.items()):
+            if now - touched >= DB_SESSION_TOUCH_INTERVAL_SECONDS:
+                _last_touched.pop(touched_session_id, None)
+    _last_touched[session_id] = now
+    store.touch(session_id)
+
+
+def _forget_session(session_id: str) -> None:
+    session_cache.invalidate(session_id)
+    session_versions.bump(session_id)
+    _last_touched.pop(session_id, None)
+
 
+session_janitor = SessionJanitor(
+    get_session_store, on_evict=_forget_session, tasks=[compact_reservations]
+)
 
-def prepare_db_file(session_id: str, db: str) -> str:
-    session_db_path = get_session_db_path(session_id)
-    os.makedirs(session_db_path, exist_ok=True)
-    destination_file = os.path.join(session_db_path, db)
-    if not os.path.exists(destination_file):
-        origin_file = os.path.join(ORIGIN_DB_PATH, db)
-        shutil.copy(origin_file, destination_file)
-    return destination_file
+
+def set_session_store(store: SessionStore) -> None:
+    global _session_store
+    if _session_store is not None and _session_store is not store:
+        _session_store.close()
+    _session_store = store
+    session_cache.clear()
+    session_versions.reset()
+
+
+def get_session_db_path(session_id: str) -> str:
+    return JsonSessionStore().get_session_db_path(session_id)
+
+
+class _PendingWrites:
+    def __init__(self) -> None:
+        self.writes: Dict[str, Any] = {}
+        self.appends: Dict[str, List[Any]] = {}
+
+
+_transactions = threading.local()
+
+
+def _pending_writes(session_id: str) -> Optional[_PendingWrites]:
+    return getattr(_transactions, "active", {}).get(session_id)
+
+
+@contextmanager
+def session_transaction(session_id: str) -> Iterator[None]:
+    """Groups the reads and writes of a session into one atomic unit.
+
+    The session stays locked against other threads and workers until the
+    block is left. Writes inside the block are visible to reads inside the
+    block, but are only stored, all at once, when the block completes without
+    an exception. Nested blocks for the same session join the outer one.
+    """
+    active = _transactions.__dict__.setdefault("active", {})
+    if session_id in active:
+        yield
+        return
+    store = get_session_store()
+    with store.lock(session_id):
+        pending = active[session_id] = _PendingWrites()
+        try:
+            yield
+            if pending.writes or pending.appends:
+                _store_writes(store, session_id, pending.writes, pending.appends)
+        finally:
+            del active[session_id]
+
+
+def _stamp(store: SessionStore, session_id: str, db: str) -> Any:
+    return store.stamp(session_id, db) if DB_CACHE_VALIDATE else None
+
+
+def _store_writes(
+    store: SessionStore,
+    session_id: str,
+    writes: Dict[str, Any],
+    appends: Dict[str, List[Any]],
+) -> None:
+    with store.lock(session_id):
+        previous_stamps = {db: _stamp(store, session_id, db) for db in appends}
+        try:
+            with timed(DB_OPERATION_DURATION, ("write",)):
+                if len(writes) + len(appends) > 1:
+                    store.apply(session_id, writes, appends)
+                else:
+                    for db, data in writes.items():
+                        store.write(session_id, db, data)
+                    for db, items in appends.items():
+                        for item in items:
+                            store.append(session_id, db, item)
+        except BaseException:
+            for db in [*writes, *appends]:
+                session_cache.invalidate(session_id, db)
+            session_versions.bump(session_id)
+            raise
+        for db, data in writes.items():
+            size = estimate_size(data)
+            record_db_bytes(db, "written", size)
+            session_cache.put(
+                session_id, db, data, size, _stamp(store, session_id, db),
+            )
+        for db, items in appends.items():
+            size = estimate_size(items)
+            record_db_bytes(db, "written", size)
+            session_cache.extend(
+                session_id, db, items, size,
+                previous_stamps[db], _stamp(store, session_id, db),
+            )
+        # only after the cache is updated, readers of the new version must not
+        # see the previous data
+        session_versions.bump(session_id)
+
+
+def _read_stored(session_id: str, db: str) -> Any:
+    store = get_session_store()
+    _record_access(store, session_id)
+    # the stamp has to be taken first, a concurrent write then only leads to
+    # a stale stamp and thereby to a miss on the next lookup
+    stamp = _stamp(store, session_id, db)
+    data = session_cache.get(session_id, db, stamp)
+    if data is None:
+        with timed(DB_OPERATION_DURATION, ("read",)):
+            data = store.read(session_id, db)
+        size = estimate_size(data)
+        record_db_bytes(db, "read", size)
+        session_cache.put(session_id, db, data, size, stamp)
+    return data
+
+
+def get_session_version(session_id: str, dbs: Iterable[str] = ()) -> Optional[Hashable]:
+    """Returns a value that changes whenever the given tables of a session change.
+
+    Writes of this process bump the version of the session. Unless
+    `DB_CACHE_VALIDATE` is disabled, the stamps of the stored tables are part
+    of the version, so that writes of other workers change it as well. Inside
+    a session transaction with pending writes there is no version, `None`.
+    """
+    if _pending_writes(session_id) is not None:
+        return None
+    version = session_versions.get(session_id)
+    store = get_session_store()
+    _record_access(store, session_id)
+    if not DB_CACHE_VALIDATE:
+        return version
+    stamps = tuple(
+        store.stamp(session_id, db) for db in dbs if db not in READ_ONLY_DBS
+    )
+    return version, stamps
 
 
 def read_db(session_id: str, db: str) -> Any:
-    db_file = prepare_db_file(session_id, db)
-    return read_json_file(db_file)
+    if db in READ_ONLY_DBS:
+        # shared by all sessions, never touches the session storage
+        return get_seed(db)
+    pending = _pending_writes(session_id)
+    if pending is not None and db in pending.writes:
+        return pending.writes[db]
+    data = _read_stored(session_id, db)
+    if pending is not None and db in pending.appends:
+        return data + pending.appends[db]
+    return data
 
 
 def write_db(session_id: str, db: str, data: Any) -> None:
-    db_file = prepare_db_file(session_id, db)
-    write_json_to_file(db_file, data)
+    if db in READ_ONLY_DBS:
+        raise ValueError(f"The db '{db}' is read-only and can not be written to.")
+    # the data ends up in the session cache, later changes of the caller
+    # must not leak into it
+    data = copy.deepcopy(data)
+    pending = _pending_writes(session_id)
+    if pending is None:
+        _store_writes(get_session_store(), session_id, {db: data}, {})
+        return
+    pending.writes[db] = data
+    pending.appends.pop(db, None)
+
+
+def append_db(session_id: str, db: str, item: Any) -> None:
+    if db in READ_ONLY_DBS:
+        raise ValueError(f"The db '{db}' is read-only and can not be written to.")
+    item = copy.deepcopy(item)
+    pending = _pending_writes(session_id)
+    if pending is None:
+        _store_writes(get_session_store(), session_id, {}, {db: [item]})
+    elif db in pending.writes:
+        pending.writes[db] = pending.writes[db] + [item]
+    else:
+        pending.appends.setdefault(db, []).append(item)
+
+
+MODELS: Dict[str, type] = {
+    MY_ACCOUNT: MyAccount,
+    TRANSACTIONS: Transaction,
+    CONTACTS: Contact,
+    RESTAURANTS: Restaurant,
+    PORTFOLIO_OPTIONS: Portfolio,
+}
+
+
+def decode_rows(db: str, rows: Iterable[Any]) -> List[Any]:
+    with timed(DB_OPERATION_DURATION, ("decode",)):
+        if DB_COMPACT_RECORDS:
+            if db in READ_ONLY_DBS:
+                return list(records.seed_records(db))
+            return records.decode_rows(db, rows)
+        model = MODELS[db]
+        return [model(**item) for item in rows]
+
+
+def decode_row(db: str, row: Any) -> Any:
+    if DB_COMPACT_RECORDS:
+        return records.decode_row(db, row)
+    return MODELS[db](**row)
 
 
 def get_contacts(session_id: str) -> List[Contact]:
-    return [Contact(**item) for item in read_db(session_id, CONTACTS)]
+    return decode_rows(CONTACTS, read_db(session_id, CONTACTS))
 
 
 def get_transactions(session_id: str):
-    return [Transaction(**item) for item in read_db(session_id, TRANSACTIONS)]
+    return decode_rows(TRANSACTIONS, read_db(session_id, TRANSACTIONS))
+
+
+def _iter_transaction_rows(session_id: str, start: int = 0) -> Iterable[Any]:
+    if _pending_writes(session_id) is not None:
+        return itertools.islice(read_db(session_id, TRANSACTIONS), start, None)
+    store = get_session_store()
+    _record_access(store, session_id)
+    rows = session_cache.get(
+        session_id, TRANSACTIONS, _stamp(store, session_id, TRANSACTIONS)
+    )
+    if rows is None:
+        return store.iter_rows(session_id, TRANSACTIONS, start)
+    return itertools.islice(rows, start, None)
+
+
+def iter_transactions(session_id: str) -> Iterator[Transaction]:
+    """Streams the transactions of a session without loading the full history."""
+    for item in _iter_transaction_rows(session_id):
+        yield decode_row(TRANSACTIONS, item)
+
+
+AMOUNT_REGEX = re.compile(r"\d[\d.,]*")
+
+
+def parse_amount(amount: str) -> Optional[float]:
+    """Returns the numeric value of an amount like `30$`, if it has one.
+
+    `,` is a thousands separator, e.g. in `1,000$`. If an amount contains both
+    `.` and `,`, the last one is the decimal point, e.g. in `1.000,50$`. An
+    amount with several `.` uses them as thousands separators.
+    """
+    match = AMOUNT_REGEX.search(amount)
+    if match is None:
+        return None
+    number = match.group().rstrip(".,")
+    if "," in number and "." in number:
+        decimal = "," if number.rindex(",") > number.rindex(".") else "."
+        thousands = "." if decimal == "," else ","
+        number = number.replace(thousands, "").replace(decimal, ".")
+    elif number.count(".") > 1:
+        number = number.replace(".", "")
+    else:
+        number = number.replace(",", "")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _parse_datetime(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.min
+
+
+class TransactionPage(NamedTuple):
+    transactions: List[Transaction]
+    total: int
+
+
+def query_transactions(
+    session_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    recipient: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> TransactionPage:
+    """Returns one page of the matching transactions, newest first.
+
+    `start` is inclusive and `end` exclusive. Transactions without a numeric
+    amount never match an amount filter. The history is streamed and only
+    the rows of the requested page are kept and decoded, `total` is the
+    number of all matching transactions.
+    """
+    recipient = recipient.lower() if recipient is not None else None
+    matches = []
+    total = 0
+    for index, item in enumerate(_iter_transaction_rows(session_id)):
+        if recipient is not None and item["recipient"].lower() != recipient:
+            continue
+        if min_amount is not None or max_amount is not None:
+            amount = parse_amount(item["amount"])
+            if amount is None:
+                continue
+            if min_amount is not None and amount < min_amount:
+                continue
+            if max_amount is not None and amount > max_amount:
+                continue
+        timestamp = _parse_datetime(item["datetime"])
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and timestamp >= end:
+            continue
+        total += 1
+        # the row index breaks ties, later rows were added later
+        matches.append((timestamp, index, item))
+        if limit is not None and len(matches) > 2 * (offset + limit):
+            matches = heapq.nlargest(offset + limit, matches)
+
+    if limit is None:
+        page = sorted(matches, reverse=True)[offset:]
+    else:
+        page = heapq.nlargest(offset + limit, matches)[offset:]
+    return TransactionPage(
+        [decode_row(TRANSACTIONS, item) for _, _, item in page], total
+    )
+
+
+def money(value: float) -> Union[int, float]:
+    """Rounds an amount to cents, whole amounts are returned as `int`."""
+    value = round(value, 2)
+    return int(value) if float(value).is_integer() else value
+
+
+def signed_amount(row: Any) -> Union[int, float]:
+    """Returns the change of the account balance caused by a transaction."""
+    amount = money(parse_amount(row["amount"]) or 0)
+    if row["recipient"] == "self":
+        return amount
+    if row["sender"] == "self":
+        return -amount
+    return 0
+
+
+def get_balance(
+    session_id: str, at: Optional[datetime] = None
+) -> Union[int, float]:
+    """Returns the account balance, now or as of the given point in time.
+
+    The current balance is kept up to date by `add_transaction`. Balances in
+    the past start from the closest snapshot and only replay the transactions
+    between it and the next snapshot. Transactions are expected to be added
+    in chronological order.
+    """
+    balance = read_db(session_id, BALANCE)
+    if at is None:
+        return money(balance["balance"])
+
+    # the current balance is the most recent snapshot
+    snapshots = list(read_db(session_id, BALANCE_SNAPSHOTS))
+    if not snapshots or snapshots[-1]["transactions"] != balance["transactions"]:
+        snapshots.append(balance)
+    index = bisect.bisect_right(
+        [_parse_datetime(snapshot["datetime"]) for snapshot in snapshots], at
+    )
+    if index == 0:
+        # earlier than every snapshot, undo the later transactions before the first
+        snapshot, direction = snapshots[0], -1
+        start, stop = 0, snapshot["transactions"]
+    else:
+        snapshot, direction = snapshots[index - 1], 1
+        start = snapshot["transactions"]
+        stop = snapshots[index]["transactions"] if index < len(snapshots) else start
+
+    result = snapshot["balance"]
+    for row in itertools.islice(
+        _iter_transaction_rows(session_id, start), stop - start
+    ):
+        if (_parse_datetime(row["datetime"]) <= at) == (direction == 1):
+            result += direction * signed_amount(row)
+    return money(result)
 
 
 def get_account(session_id: str):
-    return MyAccount(**read_db(session_id, MY_ACCOUNT))
-
-
-def write_account(session_id: str, account: MyAccount) -> None:
-    write_db(session_id, MY_ACCOUNT, account.dict())
+    account = decode_row(MY_ACCOUNT, read_db(session_id, MY_ACCOUNT))
+    # the funds are derived from the transactions, the stored value is only
+    # the one of the seed and is never written back
+    account.funds = get_balance(session_id)
+    return account
 
 
 def add_contact(session_id: str, contact: Contact) -> None:
-    contacts = get_contacts(session_id)
-    contacts.append(contact)
-    write_db(session_id, CONTACTS, [c.dict() for c in contacts])
+    with session_transaction(session_id):
+        contacts = get_contacts(session_id)
+        contacts.append(contact)
+        write_db(session_id, CONTACTS, [c.dict() for c in contacts])
 
 
 def add_transaction(session_id: str, transaction: Transaction) -> None:
-    transactions = get_transactions(session_id)
-    transactions.append(transaction)
-    write_db(session_id, TRANSACTIONS, [t.dict() for t in transactions])
+    """Adds a transaction and updates the account balance with it."""
+    row = transaction.dict()
+    with session_transaction(session_id):
+        append_db(session_id, TRANSACTIONS, row)
+        balance = dict(read_db(session_id, BALANCE))
+        balance["balance"] = money(balance["balance"] + signed_amount(row))
+        balance["transactions"] += 1
+        if _parse_datetime(row["datetime"]) > _parse_datetime(balance["datetime"]):
+            balance["datetime"] = row["datetime"]
+        write_db(session_id, BALANCE, balance)
+        if balance["transactions"] % DB_BALANCE_SNAPSHOT_INTERVAL == 0:
+            append_db(session_id, BALANCE_SNAPSHOTS, balance)
 
 
 def write_contacts(session_id: str, contacts: List[Contact]) -> None:
@@ -109,8 +695,86 @@ def write_contacts(session_id: str, contacts: List[Contact]) -> None:
 
 
 def get_restaurants(session_id: str) -> List[Restaurant]:
-    return [Restaurant(**item) for item in read_db(session_id, RESTAURANTS)]
+    return decode_rows(RESTAURANTS, read_db(session_id, RESTAURANTS))
 
 
 def get_portfolio_options(session_id: str) -> List[Portfolio]:
-    return [Portfolio(**item) for item in read_db(session_id, PORTFOLIO_OPTIONS)]
\ No newline at end of file
+    return decode_rows(PORTFOLIO_OPTIONS, read_db(session_id, PORTFOLIO_OPTIONS))
+
+
+_executor: Optional[Tuple[int, ThreadPoolExecutor]] = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Returns the bounded thread pool that runs the blocking storage calls."""
+    global _executor
+    executor = _executor
+    if executor is None or executor[0] != os.getpid():
+        with _executor_lock:
+            executor = _executor
+            # threads of a pool do not survive a fork
+            if executor is None or executor[0] != os.getpid():
+                executor = (
+                    os.getpid(),
+                    ThreadPoolExecutor(
+                        max_workers=DB_EXECUTOR_MAX_WORKERS,
+                        thread_name_prefix="db",
+                    ),
+                )
+                _executor = executor
+    return executor[1]
+
+
+async def run_in_db_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs a blocking storage call without blocking the event loop.
+
+    Everything that has to happen within one `session_transaction` must be
+    passed as a single call, as the transaction is bound to the thread.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def aget_contacts(session_id: str) -> List[Contact]:
+    return await run_in_db_executor(get_contacts, session_id)
+
+
+async def aget_transactions(session_id: str) -> List[Transaction]:
+    return await run_in_db_executor(get_transactions, session_id)
+
+
+async def aquery_transactions(session_id: str, **filters: Any) -> TransactionPage:
+    return await run_in_db_executor(query_transactions, session_id, **filters)
+
+
+async def aget_balance(
+    session_id: str, at: Optional[datetime] = None
+) -> Union[int, float]:
+    return await run_in_db_executor(get_balance, session_id, at)
+
+
+async def aget_account(session_id: str) -> MyAccount:
+    return await run_in_db_executor(get_account, session_id)
+
+
+async def aadd_contact(session_id: str, contact: Contact) -> None:
+    await run_in_db_executor(add_contact, session_id, contact)
+
+
+async def aadd_transaction(session_id: str, transaction: Transaction) -> None:
+    await run_in_db_executor(add_transaction, session_id, transaction)
+
+
+async def awrite_contacts(session_id: str, contacts: List[Contact]) -> None:
+    await run_in_db_executor(write_contacts, session_id, contacts)
+
+
+async def aget_restaurants(session_id: str) -> List[Restaurant]:
+    return await run_in_db_executor(get_restaurants, session_id)
+
+
+async def aget_portfolio_options(session_id: str) -> List[Portfolio]:
+    return await run_in_db_executor(get_portfolio_options, session_id)
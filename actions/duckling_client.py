@@ -0,0 +1,164 @@
+"""Async Duckling client of the action server.
+
+Keeps one `aiohttp` session with a pooled, keep-alive connector per event
+loop, so that consecutive calls reuse their connections. Every call has a
+latency budget: a call that does not finish within it is cancelled and
+treated as if Duckling found nothing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from actions.entity_extractor import duckling_config
+from actions.instrumentation import external_call
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DUCKLING_POOL_SIZE = int(os.environ.get("DUCKLING_POOL_SIZE", 16))
+DUCKLING_LATENCY_BUDGET_SECONDS = float(
+    os.environ.get("DUCKLING_LATENCY_BUDGET_SECONDS", 1.0)
+)
+
+
+class DucklingClient:
+    def __init__(
+        self,
+        url: Optional[str],
+        dimensions: Optional[List[str]] = None,
+        locale: Optional[str] = None,
+        timezone: Optional[str] = None,
+        pool_size: int = DUCKLING_POOL_SIZE,
+        budget: float = DUCKLING_LATENCY_BUDGET_SECONDS,
+    ) -> None:
+        self.url = url
+        self.dimensions = dimensions
+        self.locale = locale or "en_US"
+        self.timezone = timezone
+        self.pool_size = pool_size
+        self.budget = budget
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def session(self) -> "aiohttp.ClientSession":
+        """Returns the pooled session of the running event loop."""
+        # imported on first use, it is one of the slowest imports of the actions
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session, previous_loop = self._session, self._loop
+        if session is None or session.closed or previous_loop is not loop:
+            # replaced before closing the previous one, so that concurrent
+            # calls share the new session
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size, keepalive_timeout=60
+                ),
+            )
+            self._loop = loop
+            if session is not None and previous_loop is not loop:
+                await self._close_previous(session, previous_loop)
+        return self._session
+
+    @staticmethod
+    async def _close_previous(
+        session: "aiohttp.ClientSession", loop: Optional[asyncio.AbstractEventLoop]
+    ) -> None:
+        """Closes the session of an event loop that is no longer used."""
+        if session.closed:
+            return
+        if loop is not None and loop.is_running():
+            # still serving another thread, the session is closed over there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            logger.warning(f"Failed to close the Duckling session of an old loop: {e}")
+
+    def _payload(self, text: str) -> Dict[str, Any]:
+        payload = {
+            "text": text,
+            "locale": self.locale,
+            "reftime": int(time.time() * 1000),
+        }
+        if self.timezone:
+            payload["tz"] = self.timezone
+        if self.dimensions:
+            payload["dims"] = json.dumps(self.dimensions)
+        return payload
+
+    async def _request(self, text: str) -> List[Dict[str, Any]]:
+        session = await self.session()
+        async with session.post(
+            f"{self.url}/parse", data=self._payload(text)
+        ) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def parse(
+        self, text: str, budget: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Returns the raw Duckling matches of a text, empty on errors or timeouts."""
+        if not self.url:
+            return []
+        import aiohttp
+
+        budget = self.budget if budget is None else budget
+        try:
+            with external_call("duckling"):
+                return await asyncio.wait_for(self._request(text), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"Duckling did not answer within {budget}s for '{text}'.")
+        except (aiohttp.ClientError, ValueError) as e:
+            logger.warning(f"Failed to parse '{text}' with Duckling: {e}")
+        return []
+
+    async def parse_many(
+        self, texts: List[str], budget: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Parses several texts concurrently, sharing one latency budget."""
+        return list(
+            await asyncio.gather(*(self.parse(text, budget) for text in texts))
+        )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def to_entity(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a Duckling match to the entity format of the Duckling extractor."""
+    value = match["value"]
+    if value.get("type") == "interval":
+        entity_value = {
+            "from": value.get("from", {}).get("value"),
+            "to": value.get("to", {}).get("value"),
+        }
+    else:
+        entity_value = value.get("value")
+    return {
+        "start": match["start"],
+        "end": match["end"],
+        "text": match.get("body", ""),
+        "value": entity_value,
+        "confidence": 1.0,
+        "additional_info": value,
+        "entity": match["dim"],
+        "extractor": "DucklingClient",
+    }
+
+
+duckling_client = DucklingClient(
+    duckling_config.get("url"),
+    dimensions=duckling_config.get("dimensions"),
+    locale=duckling_config.get("locale"),
+    timezone=duckling_config.get("timezone"),
+)
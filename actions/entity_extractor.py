@@ -1,15 +1,36 @@
 import os
+import threading
+from typing import Any, Optional
 
 from dotenv import load_dotenv
-from rasa.nlu.extractors.duckling_entity_extractor import DucklingEntityExtractor
 
 load_dotenv()
 duckling_url = os.environ.get("RASA_DUCKLING_HTTP_URL")
 
+# the defaults of `DucklingEntityExtractor.get_default_config()`, the extractor
+# itself pulls in large parts of Rasa and is only imported on first use
 duckling_config = {
-    **DucklingEntityExtractor.get_default_config(),
+    "locale": None,
+    "timezone": None,
+    "timeout": 3,
     "url": duckling_url,
     "dimensions": ["time"]
 }
 
-duckling_entity_extractor = DucklingEntityExtractor(duckling_config)
+_duckling_entity_extractor: Optional[Any] = None
+_duckling_entity_extractor_lock = threading.Lock()
+
+
+def get_duckling_entity_extractor() -> Any:
+    global _duckling_entity_extractor
+    if _duckling_entity_extractor is None:
+        with _duckling_entity_extractor_lock:
+            if _duckling_entity_extractor is None:
+                from rasa.nlu.extractors.duckling_entity_extractor import (
+                    DucklingEntityExtractor,
+                )
+
+                _duckling_entity_extractor = DucklingEntityExtractor(
+                    {**DucklingEntityExtractor.get_default_config(), **duckling_config}
+                )
+    return _duckling_entity_extractor
@@ -1,24 +1,20 @@
-import re
 from typing import Any, Dict
 from datetime import datetime
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_account, write_account, add_transaction, Transaction
-
-
-AMOUNT_OF_MONEY_REGEX = re.compile(r"\d*[.,]*\d+")
+from actions.db import aadd_transaction, Transaction
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ExecuteTransfer(Action):
 
     def name(self) -> str:
         return "execute_transfer"
 
-    def run(self, dispatcher: CollectingDispatcher,
+    async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker, domain: Dict[str, Any]):
-        account = get_account(tracker.sender_id)
-
         recipient = tracker.get_slot("transfer_money_recipient")
         amount_of_money = tracker.get_slot("transfer_money_amount_of_money")
 
@@ -29,11 +25,9 @@ class ExecuteTransfer(Action):
         if recipient == "Jack":
             return [SlotSet("transfer_money_transfer_successful", False)]
 
-        amount_of_money_value = float(re.findall(AMOUNT_OF_MONEY_REGEX, amount_of_money)[0])
-        account.funds -= amount_of_money_value
+        # the account balance is updated together with the transaction
         new_transaction = \
             Transaction(datetime=datetime.now().isoformat(), recipient=recipient,
                         sender="self", amount=amount_of_money, description="")
-        add_transaction(tracker.sender_id, new_transaction)
-        write_account(tracker.sender_id, account)
+        await aadd_transaction(tracker.sender_id, new_transaction)
         return [SlotSet("transfer_money_transfer_successful", True)]
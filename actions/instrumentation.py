@@ -0,0 +1,374 @@
+"""Latency and I/O metrics of the action server.
+
+Action classes decorated with `instrumented` record the latency of every run
+per action name. The storage helpers of `actions/db.py` record the duration
+of storage reads, writes and model decoding and the bytes they read and
+write, the in-process caches report their hits and misses, and calls to
+external services like Duckling record their duration.
+
+The metrics are served in the Prometheus text format on
+`http://<ACTION_METRICS_HOST>:<ACTION_METRICS_PORT>/metrics` if a port is
+configured. If OpenTelemetry is installed, actions and external calls are
+also recorded as spans. They are exported via OTLP if the `tracing` section
+of the endpoints file is configured with `type: otlp`, otherwise they go to
+the globally configured tracer provider, if any.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACTION_METRICS_PORT = int(os.environ.get("ACTION_METRICS_PORT", 0))
+ACTION_METRICS_HOST = os.environ.get("ACTION_METRICS_HOST", "127.0.0.1")
+ACTION_ENDPOINTS_FILE = os.environ.get("ACTION_ENDPOINTS_FILE", "endpoints.yml")
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{value}"'
+        for name, value in zip(names, (_escape(v) for v in values))
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            *(
+                f"{self.name}{_format_labels(self.labels, labels)} {value}"
+                for labels, value in values
+            ),
+        ]
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> (count per bucket, sum, count)
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        with self._lock:
+            counts, total, count = self._values.get(
+                labels, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def count(self, labels: Labels = ()) -> int:
+        with self._lock:
+            return self._values.get(labels, ([], 0.0, 0))[2]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._values.items()
+            )
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, count) in values:
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.labels, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+            bucket_labels = _format_labels(self.labels, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+ACTION_DURATION = Histogram(
+    "actions_action_duration_seconds", "Duration of action runs.", ("action",)
+)
+ACTION_ERRORS = Counter(
+    "actions_action_errors_total", "Action runs that raised an exception.", ("action",)
+)
+DB_OPERATION_DURATION = Histogram(
+    "actions_db_operation_duration_seconds",
+    "Duration of storage reads and writes and of decoding rows into models.",
+    ("operation",),
+)
+DB_BYTES = Counter(
+    "actions_db_bytes_total",
+    "Bytes of session data read from and written to the storage.",
+    ("db", "direction"),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "actions_external_call_duration_seconds",
+    "Duration of calls to external services.",
+    ("service", "outcome"),
+)
+
+# cache name -> function returning the stats of the cache
+_caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """Reports the `hits` and `misses` of a cache stats function as metrics."""
+    _caches[name] = stats
+
+
+def _render_caches() -> List[str]:
+    lines = [
+        "# HELP actions_cache_lookups_total Lookups of the in-process caches.",
+        "# TYPE actions_cache_lookups_total counter",
+    ]
+    for name, stats in sorted(_caches.items()):
+        values = stats()
+        for key, result in (("hits", "hit"), ("misses", "miss")):
+            labels = _format_labels(("cache", "result"), (name, result))
+            lines.append(f"actions_cache_lookups_total{labels} {values[key]}")
+    return lines
+
+
+def render_metrics() -> str:
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in (
+        ACTION_DURATION, ACTION_ERRORS, DB_OPERATION_DURATION, DB_BYTES,
+        EXTERNAL_CALL_DURATION,
+    ):
+        lines.extend(metric.render())
+    lines.extend(_render_caches())
+    return "\n".join(lines) + "\n"
+
+
+_tracer: Any = None
+_tracer_lock = threading.Lock()
+
+
+def _tracing_config(endpoints_file: str) -> Optional[Dict[str, Any]]:
+    import yaml
+
+    try:
+        with open(endpoints_file, encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return None
+    tracing = config.get("tracing")
+    return tracing if isinstance(tracing, dict) else None
+
+
+def _create_tracer() -> Any:
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    config = _tracing_config(ACTION_ENDPOINTS_FILE)
+    if config is None or config.get("type") != "otlp":
+        return trace.get_tracer(__name__)
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "The OTLP exporter is not installed, action spans are not exported."
+        )
+        return trace.get_tracer(__name__)
+    provider = TracerProvider(
+        resource=Resource.create(
+            {"service.name": config.get("service_name", "rasa")}
+        )
+    )
+    provider.add_span_processor(
+        BatchSpanProcessor(
+            OTLPSpanExporter(endpoint=config.get("endpoint"), insecure=True)
+        )
+    )
+    return provider.get_tracer(__name__)
+
+
+def get_tracer() -> Any:
+    """Returns the OpenTelemetry tracer of the actions, `None` if not installed."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _create_tracer() or False
+    return _tracer or None
+
+
+def span(name: str, **attributes: Any) -> Any:
+    tracer = get_tracer()
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+@contextmanager
+def timed(histogram: Histogram, labels: Labels = ()) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(labels, time.perf_counter() - start)
+
+
+@contextmanager
+def external_call(service: str) -> Iterator[None]:
+    """Records the duration and the outcome of a call to an external service."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(f"{service}.call", service=service):
+            yield
+    except (TimeoutError, asyncio.TimeoutError):
+        outcome = "timeout"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(
+            (service, outcome), time.perf_counter() - start
+        )
+
+
+def record_db_bytes(db: str, direction: str, size: int) -> None:
+    DB_BYTES.inc((db, direction), size)
+
+
+@contextmanager
+def _action_run(action: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        with span(f"action.{action}", action=action):
+            yield
+    except BaseException:
+        ACTION_ERRORS.inc((action,))
+        raise
+    finally:
+        ACTION_DURATION.observe((action,), time.perf_counter() - start)
+
+
+def instrumented(cls: type) -> type:
+    """Class decorator recording the latency of the `run` method of an action."""
+    run = cls.run
+
+    if inspect.iscoroutinefunction(run):
+
+        @functools.wraps(run)
+        async def instrumented_run(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with _action_run(self.name()):
+                return await run(self, *args, **kwargs)
+
+    else:
+
+        @functools.wraps(run)
+        def instrumented_run(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with _action_run(self.name()):
+                return run(self, *args, **kwargs)
+
+    cls.run = instrumented_run
+    start_metrics_server()
+    return cls
+
+
+def _create_metrics_server(host: str, port: int) -> Any:
+    # only imported by the processes that serve metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+
+_metrics_server: Any = None
+_metrics_server_started = False
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(
+    port: int = ACTION_METRICS_PORT, host: str = ACTION_METRICS_HOST
+) -> Any:
+    """Serves the metrics in a background thread, once per process."""
+    global _metrics_server, _metrics_server_started
+    if port <= 0:
+        return None
+    with _metrics_server_lock:
+        if not _metrics_server_started:
+            _metrics_server_started = True
+            try:
+                _metrics_server = _create_metrics_server(host, port)
+            except OSError as e:
+                logger.warning(f"Failed to serve the action metrics on port {port}: {e}")
+                return None
+            threading.Thread(
+                target=_metrics_server.serve_forever, name="action-metrics", daemon=True
+            ).start()
+    return _metrics_server
@@ -2,19 +2,25 @@ from typing import Any, Dict
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_contacts
+from actions.action_cache import amemoized
+from actions.db import CONTACTS, aget_contacts
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ListContacts(Action):
 
     def name(self) -> str:
         return "list_contacts"
 
-    def run(self, dispatcher: CollectingDispatcher,
+    async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker, domain: Dict[str, Any]):
-        contacts = get_contacts(tracker.sender_id)
-        if len(contacts) > 0:
-            contacts_list = "".join([f"- {c.name} ({c.handle}) \n" for c in contacts])
-            return [SlotSet("contacts_list", contacts_list)]
-        else:
-            return [SlotSet("contacts_list", None)]
+        async def contacts_list():
+            contacts = await aget_contacts(tracker.sender_id)
+            if len(contacts) > 0:
+                return "".join([f"- {c.name} ({c.handle}) \n" for c in contacts])
+            return None
+
+        return [SlotSet("contacts_list", await amemoized(
+            self.name(), tracker.sender_id, [CONTACTS], (), contacts_list
+        ))]
@@ -3,8 +3,10 @@ from typing import Any, Dict
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from actions.db import get_restaurants
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ListRestaurants(Action):
 
     def name(self) -> str:
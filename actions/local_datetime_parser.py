@@ -0,0 +1,226 @@
+"""A local parser for the most common date and time expressions.
+
+Handles a small, well-defined grammar and rejects everything else, so that
+those inputs can be passed on to Duckling:
+
+    expression := relative | day | time | day time | time day
+    relative   := "in" count ("minute" | "hour" | "day" | "week")["s"]
+    count      := digits | "a" | "an" | "one" ... "twelve"
+    day        := "today" | "tonight" | "tomorrow" | "yesterday"
+                | "day after tomorrow" | ["on" | "this" | "next"] weekday
+                | month day-of-month [year] | day-of-month ["of"] month [year]
+    time       := ["at"] hour[":"minute] ("am" | "pm") | ["at"] hour":"minute
+                | "noon"
+
+A 24-hour time needs minutes and an hour above 12 (or a leading zero), as
+"at 7" or "7:30" are ambiguous. The values follow Duckling, including where
+it is surprising: a weekday is the next one after today ("next" does not
+skip a week), but a weekday with a time of day can be today, and a day of
+the month without a year stays in the current year until the month is
+over. A time without a day is the next time it occurs, a relative time is
+truncated to the grain below its unit. Results have the shape of a Duckling
+`time` entity.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+MONTHS = {
+    "january": 1, "jan": 1,
+    "february": 2, "feb": 2,
+    "march": 3, "mar": 3,
+    "april": 4, "apr": 4,
+    "may": 5,
+    "june": 6, "jun": 6,
+    "july": 7, "jul": 7,
+    "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9,
+    "october": 10, "oct": 10,
+    "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+COUNTS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12,
+}
+UNITS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+# the grain of "in <count> <unit>", the value is truncated to it
+RELATIVE_GRAINS = {"minute": "second", "hour": "minute", "day": "hour", "week": "day"}
+
+_WEEKDAY = "|".join(WEEKDAYS)
+_MONTH = "|".join(MONTHS)
+_DAY_OF_MONTH = r"(?P<dom>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:\s+(?P<year>\d{4}))?"
+
+RELATIVE_RE = re.compile(
+    rf"in\s+(?P<count>\d+|{'|'.join(COUNTS)})\s+(?P<unit>{'|'.join(UNITS)})s?"
+)
+WEEKDAY_RE = re.compile(rf"(?:(?P<modifier>on|this|next)\s+)?(?P<weekday>{_WEEKDAY})")
+MONTH_FIRST_RE = re.compile(rf"(?:on\s+)?(?P<month>{_MONTH})\s+{_DAY_OF_MONTH}{_YEAR}")
+DAY_FIRST_RE = re.compile(
+    rf"(?:on\s+)?(?:the\s+)?{_DAY_OF_MONTH}\s+(?:of\s+)?(?P<month>{_MONTH}){_YEAR}"
+)
+TIME_RE = re.compile(
+    r"(?:at\s+)?(?:(?P<noon>noon)|(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?"
+    r"\s*(?P<meridiem>am|pm|a\.m\.|p\.m\.)?)"
+)
+RELATIVE_DAYS = {
+    "today": 0,
+    "tonight": 0,
+    "tomorrow": 1,
+    "yesterday": -1,
+    "day after tomorrow": 2,
+    "the day after tomorrow": 2,
+}
+
+
+def _normalize(text: str) -> str:
+    text = text.strip().lower().rstrip(".!?")
+    return re.sub(r"[\s,]+", " ", text)
+
+
+def _parse_day(text: str, today: date, with_time: bool = False) -> Optional[date]:
+    if text in RELATIVE_DAYS:
+        return today + timedelta(days=RELATIVE_DAYS[text])
+
+    match = WEEKDAY_RE.fullmatch(text)
+    if match:
+        days = (WEEKDAYS[match.group("weekday")] - today.weekday()) % 7
+        if days == 0 and not (with_time and match.group("modifier") in (None, "on")):
+            # only "wednesday at 6pm" is today on a Wednesday, even if 6pm is over
+            days = 7
+        return today + timedelta(days=days)
+
+    match = MONTH_FIRST_RE.fullmatch(text) or DAY_FIRST_RE.fullmatch(text)
+    if match:
+        month, day = MONTHS[match.group("month")], int(match.group("dom"))
+        year = int(match.group("year")) if match.group("year") else today.year
+        if match.group("year") is None and month < today.month:
+            year += 1
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return None
+    return None
+
+
+def _parse_time(text: str) -> Optional[Tuple[int, int, str]]:
+    """Returns the hour, minute and grain of a time of day."""
+    match = TIME_RE.fullmatch(text)
+    if not match:
+        return None
+    if match.group("noon"):
+        return 12, 0, "hour"
+
+    hour_text, minute_text = match.group("hour"), match.group("minute")
+    hour, minute = int(hour_text), int(minute_text or 0)
+    meridiem = (match.group("meridiem") or "").replace(".", "")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif minute_text is None or not (hour > 12 or hour_text.startswith("0")):
+        # "7" or "7:30" could be in the morning or in the evening
+        return None
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute, "minute" if minute_text else "hour"
+
+
+def _entity(text: str, value: datetime, grain: str) -> Dict[str, Any]:
+    iso_value = value.isoformat(timespec="milliseconds")
+    result = {"value": iso_value, "grain": grain, "type": "value"}
+    return {
+        "start": 0,
+        "end": len(text),
+        "text": text,
+        "value": iso_value,
+        "confidence": 1.0,
+        "additional_info": {**result, "values": [result]},
+        "entity": "time",
+        "extractor": "LocalDatetimeParser",
+    }
+
+
+def _combine(
+    day: Optional[date], time: Optional[Tuple[int, int, str]], now: datetime
+) -> Optional[Tuple[datetime, str]]:
+    if time is None:
+        return datetime.combine(day, datetime.min.time(), now.tzinfo), "day"
+    hour, minute, grain = time
+    if day is not None:
+        return datetime.combine(day, datetime.min.time(), now.tzinfo).replace(
+            hour=hour, minute=minute
+        ), grain
+    value = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if value < now:
+        value += timedelta(days=1)
+    return value, grain
+
+
+def parse_local_datetime(text: str, now: datetime) -> Optional[Dict[str, Any]]:
+    """Parses an expression of the grammar relative to the timezone-aware `now`.
+
+    Returns a Duckling-like `time` entity or `None` if the expression is not
+    part of the grammar.
+    """
+    normalized = _normalize(text)
+    if not normalized:
+        return None
+
+    match = RELATIVE_RE.fullmatch(normalized)
+    if match:
+        count = match.group("count")
+        count = int(count) if count.isdigit() else COUNTS[count]
+        unit = match.group("unit")
+        value = now.replace(microsecond=0) + count * UNITS[unit]
+        if unit == "hour":
+            value = value.replace(second=0)
+        elif unit == "day":
+            value = value.replace(minute=0, second=0)
+        elif unit == "week":
+            value = value.replace(hour=0, minute=0, second=0)
+        return _entity(text, value, RELATIVE_GRAINS[unit])
+
+    day = _parse_day(normalized, now.date())
+    if day is not None:
+        if normalized == "tonight":
+            # an evening interval in Duckling
+            return None
+        value, grain = _combine(day, None, now)
+        return _entity(text, value, grain)
+
+    time = _parse_time(normalized)
+    if time is not None:
+        value, grain = _combine(None, time, now)
+        return _entity(text, value, grain)
+
+    words = normalized.split(" ")
+    for split in range(1, len(words)):
+        head, tail = " ".join(words[:split]), " ".join(words[split:])
+        for day_text, time_text in ((head, tail), (tail, head)):
+            day = _parse_day(day_text, now.date(), with_time=True)
+            time = _parse_time(time_text) if day is not None else None
+            if time is None:
+                continue
+            if day_text == "tonight" and time[0] < 12:
+                return None
+            value, grain = _combine(day, time, now)
+            return _entity(text, value, grain)
+    return None
@@ -2,8 +2,10 @@ from typing import Any, Dict
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class AskPizzaConfirmationOrder(Action):
 
     def name(self) -> str:
@@ -21,6 +23,7 @@ class AskPizzaConfirmationOrder(Action):
         return []
 
 
+@instrumented
 class ActionCheckMembershipPoints(Action):
 
     def name(self) -> str:
@@ -34,6 +37,7 @@ class ActionCheckMembershipPoints(Action):
         return [SlotSet("membership_points", 150)]
 
 
+@instrumented
 class ActionShowVacancies(Action):
 
     def name(self) -> str:
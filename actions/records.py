@@ -0,0 +1,113 @@
+"""Compact record types for the tables of `actions/db.py`.
+
+The records mirror the pydantic models in `actions/db.py` (attribute access,
+`dict()` and `Transaction.stringify()`), but are plain slotted dataclasses.
+Decoding a stored row into a record skips all per-field validation, which is
+safe because every stored row was either written by `actions/db.py` itself or
+comes from the seed files in `db/`.
+"""
+
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+
+from actions.storage import (
+    CONTACTS,
+    MY_ACCOUNT,
+    PORTFOLIO_OPTIONS,
+    RESTAURANTS,
+    TRANSACTIONS,
+    get_seed,
+)
+
+
+class _Record:
+    __slots__ = ()
+
+    def dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@dataclass(slots=True)
+class MyAccountRecord(_Record):
+    account: str
+    funds: Union[int, float]
+
+
+@dataclass(slots=True)
+class TransactionRecord(_Record):
+    datetime: str
+    recipient: str
+    sender: str
+    amount: str
+    description: str
+
+    def stringify(self) -> str:
+        return f"{self.amount} from {self.sender} to " \
+               f"{self.recipient} at {self.datetime}"
+
+
+@dataclass(slots=True)
+class ContactRecord(_Record):
+    name: str
+    handle: str
+
+
+@dataclass(slots=True, frozen=True)
+class RestaurantRecord(_Record):
+    name: str
+    address: str
+    city: str
+    cuisine: str
+    capacity: int
+
+
+@dataclass(slots=True, frozen=True)
+class PortfolioRecord(_Record):
+    type: str
+    options: Tuple[str, ...]
+
+    def dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "options": list(self.options)}
+
+
+RECORD_TYPES: Dict[str, type] = {
+    MY_ACCOUNT: MyAccountRecord,
+    TRANSACTIONS: TransactionRecord,
+    CONTACTS: ContactRecord,
+    RESTAURANTS: RestaurantRecord,
+    PORTFOLIO_OPTIONS: PortfolioRecord,
+}
+
+
+def _decoder(record_type: type) -> Callable[[Any], Any]:
+    fields = record_type.__slots__
+    values = itemgetter(*fields)
+    if len(fields) == 1:
+        return lambda row: record_type(values(row))
+    return lambda row: record_type(*values(row))
+
+
+_DECODERS: Dict[str, Callable[[Any], Any]] = {
+    db: _decoder(record_type) for db, record_type in RECORD_TYPES.items()
+}
+
+_seed_records: Dict[str, Tuple[Any, Tuple[Any, ...]]] = {}
+
+
+def decode_row(db: str, row: Any) -> Any:
+    return _DECODERS[db](row)
+
+
+def decode_rows(db: str, rows: Iterable[Any]) -> List[Any]:
+    return list(map(_DECODERS[db], rows))
+
+
+def seed_records(db: str) -> Tuple[Any, ...]:
+    """Returns the immutable records of a seed table, decoded once per seed."""
+    seed = get_seed(db)
+    cached = _seed_records.get(db)
+    if cached is None or cached[0] is not seed:
+        cached = (seed, tuple(decode_rows(db, seed)))
+        _seed_records[db] = cached
+    return cached[1]
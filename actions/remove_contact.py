@@ -1,29 +1,44 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_contacts, write_contacts
+from actions.db import (
+    Contact, get_contacts, run_in_db_executor, session_transaction, write_contacts
+)
+from actions.instrumentation import instrumented
 
 
+def remove_contact_by_handle(session_id: str, handle: str) -> Optional[Contact]:
+    with session_transaction(session_id):
+        contacts = get_contacts(session_id)
+        contact_indices_with_handle = [
+            i for i, c in enumerate(contacts) if c.handle == handle
+        ]
+        if len(contact_indices_with_handle) == 0:
+            return None
+        removed_contact = contacts.pop(contact_indices_with_handle[0])
+        write_contacts(session_id, contacts)
+        return removed_contact
+
+
+@instrumented
 class RemoveContact(Action):
     def name(self) -> str:
         return "remove_contact"
 
-    def run(
+    async def run(
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[str, Any]
     ):
-        contacts = get_contacts(tracker.sender_id)
         handle = tracker.get_slot("remove_contact_handle")
 
         if handle is not None:
-            contact_indices_with_handle = [
-                i for i, c in enumerate(contacts) if c.handle == handle
-            ]
-            if len(contact_indices_with_handle) == 0:
+            # the whole read-modify-write runs as one call on a storage thread
+            removed_contact = await run_in_db_executor(
+                remove_contact_by_handle, tracker.sender_id, handle
+            )
+            if removed_contact is None:
                 return [SlotSet("return_value", "not_found")]
             else:
-                removed_contact = contacts.pop(contact_indices_with_handle[0])
-                write_contacts(tracker.sender_id, contacts)
                 return [
                     SlotSet("return_value", "success"),
                     SlotSet("remove_contact_name", removed_contact.name)
@@ -0,0 +1,291 @@
+"""Capacity-aware restaurant reservations shared by all sessions and workers.
+
+Reservations are appended to a JSONL ledger next to the session data. Every
+process keeps an index of the ledger: per restaurant, the number of seats
+taken in each time bucket of `DB_RESERVATION_BUCKET_MINUTES`. Checking a
+time window costs one dictionary lookup per bucket of the window,
+independent of the number of reservations. Bookings hold an exclusive lock
+on the ledger while they catch up with the entries of other workers, check
+the capacity and append, so concurrent bookings never overbook a restaurant.
+
+A session holds at most one reservation per restaurant. A later entry of
+the same session and restaurant replaces the earlier one, and a `released`
+entry cancels it, so checking the availability again within a conversation
+never books the seats twice. The ledger is compacted to the reservations
+that are still held by the session janitor.
+"""
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from actions.storage import (
+    DB_SESSION_ROOT, RESTAURANTS, SessionLocks, get_seed, replace_file
+)
+
+DB_RESERVATIONS_PATH = os.environ.get(
+    "DB_RESERVATIONS_PATH",
+    os.path.join(DB_SESSION_ROOT, ".reservations", "reservations.jsonl"),
+)
+DB_RESERVATION_BUCKET_MINUTES = int(os.environ.get("DB_RESERVATION_BUCKET_MINUTES", 15))
+# how long a table is blocked by a reservation
+RESERVATION_DURATION = timedelta(
+    minutes=int(os.environ.get("DB_RESERVATION_DURATION_MINUTES", 120))
+)
+# reservations that ended longer ago than this are not indexed
+RESERVATION_HISTORY = timedelta(days=1)
+
+
+@dataclass(frozen=True)
+class Reservation:
+    restaurant: str
+    start: str
+    end: str
+    party_size: int
+    session_id: str
+    released: bool = False
+
+
+class ReservationLedger:
+    def __init__(
+        self,
+        path: str,
+        capacities: Mapping[str, int],
+        bucket: timedelta = timedelta(minutes=DB_RESERVATION_BUCKET_MINUTES),
+    ) -> None:
+        self.path = path
+        self.lock_file = path + ".lock"
+        self.capacities = capacities
+        self.bucket_seconds = int(bucket.total_seconds())
+        self.locks = SessionLocks()
+        # restaurant -> bucket -> seats taken
+        self._seats: Dict[str, Dict[int, int]] = {}
+        # (session id, restaurant) -> reservation held by the session
+        self._held: Dict[Tuple[str, str], Reservation] = {}
+        self._offset = 0
+        # compaction replaces the ledger file, the index is rebuilt then
+        self._inode: Optional[int] = None
+        self._guard = threading.RLock()
+
+    def _buckets(self, start: datetime, end: datetime) -> range:
+        first = int(start.timestamp()) // self.bucket_seconds
+        last = -(-int(end.timestamp()) // self.bucket_seconds)
+        return range(first, last)
+
+    def _reservation_buckets(self, reservation: Reservation) -> range:
+        return self._buckets(
+            datetime.fromisoformat(reservation.start),
+            datetime.fromisoformat(reservation.end),
+        )
+
+    def _count(self, reservation: Reservation, sign: int) -> None:
+        seats = self._seats.setdefault(reservation.restaurant, {})
+        for bucket in self._reservation_buckets(reservation):
+            taken = seats.get(bucket, 0) + sign * reservation.party_size
+            if taken:
+                seats[bucket] = taken
+            else:
+                seats.pop(bucket, None)
+
+    def _apply(self, reservation: Reservation) -> None:
+        key = (reservation.session_id, reservation.restaurant)
+        previous = self._held.pop(key, None)
+        if previous is not None:
+            self._count(previous, -1)
+        if reservation.released:
+            return
+        end = datetime.fromisoformat(reservation.end)
+        if end < datetime.now() - RESERVATION_HISTORY:
+            return
+        self._held[key] = reservation
+        self._count(reservation, 1)
+
+    def _reset(self, inode: Optional[int]) -> None:
+        self._seats.clear()
+        self._held.clear()
+        self._offset = 0
+        self._inode = inode
+
+    def _catch_up(self) -> None:
+        """Indexes the entries other workers appended since the last call."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset(None)
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._reset(stat.st_ino)
+            f.seek(self._offset)
+            data = f.read()
+        # a line without line break is still being written
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                reservation = Reservation(**json.loads(line))
+            except (ValueError, TypeError):
+                # torn by a worker that crashed while appending
+                continue
+            self._apply(reservation)
+        self._offset += len(complete)
+
+    def _append(self, reservations: List[Reservation]) -> None:
+        # must be called with the lock held and the index caught up
+        data = "".join(json.dumps(asdict(r)) + "\n" for r in reservations)
+        line = data.encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab+") as f:
+            # make sure the entry starts on a line of its own
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._offset = f.tell()
+        for reservation in reservations:
+            self._apply(reservation)
+
+    def capacity(self, restaurant: str) -> Optional[int]:
+        return self.capacities.get(restaurant)
+
+    def free_seats(
+        self,
+        restaurant: str,
+        start: datetime,
+        end: datetime,
+        session_id: Optional[str] = None,
+    ) -> Optional[int]:
+        """Returns the seats free during the whole window, `None` if unlimited.
+
+        The seats held by `session_id` at the restaurant count as free, since
+        a new reservation of the session replaces them.
+        """
+        capacity = self.capacity(restaurant)
+        if capacity is None:
+            return None
+        with self._guard:
+            self._catch_up()
+            seats = self._seats.get(restaurant, {})
+            own = self._held.get((session_id, restaurant))
+            own_buckets = self._reservation_buckets(own) if own else range(0)
+            taken = max(
+                (
+                    seats.get(bucket, 0) - (own.party_size if bucket in own_buckets else 0)
+                    for bucket in self._buckets(start, end)
+                ),
+                default=0,
+            )
+        return capacity - taken
+
+    def has_capacity(
+        self,
+        restaurant: str,
+        start: datetime,
+        end: datetime,
+        party_size: int,
+        session_id: Optional[str] = None,
+    ) -> bool:
+        free = self.free_seats(restaurant, start, end, session_id)
+        return free is None or free >= party_size
+
+    def reserve(
+        self,
+        restaurant: str,
+        start: datetime,
+        end: datetime,
+        party_size: int,
+        session_id: str,
+    ) -> bool:
+        """Books a table if the restaurant has enough free seats for the window.
+
+        Replaces the reservation the session already holds at the restaurant,
+        booking the same table again is a no-op.
+        """
+        reservation = Reservation(
+            restaurant, start.isoformat(), end.isoformat(), party_size, session_id
+        )
+        with self._guard, self.locks.hold(self.lock_file):
+            if not self.has_capacity(restaurant, start, end, party_size, session_id):
+                return False
+            if self._held.get((session_id, restaurant)) == reservation:
+                return True
+            self._append([reservation])
+            return True
+
+    def release(self, session_id: str, restaurant: Optional[str] = None) -> int:
+        """Cancels the reservations of a session, returns how many there were."""
+        with self._guard, self.locks.hold(self.lock_file):
+            self._catch_up()
+            released = [
+                replace(reservation, released=True)
+                for (held_by, held_at), reservation in self._held.items()
+                if held_by == session_id and restaurant in (None, held_at)
+            ]
+            if released:
+                self._append(released)
+            return len(released)
+
+    def compact(self) -> None:
+        """Rewrites the ledger with only the reservations that are still held."""
+        with self._guard, self.locks.hold(self.lock_file):
+            self._catch_up()
+            if self._inode is None:
+                return
+            horizon = datetime.now() - RESERVATION_HISTORY
+            held = [
+                reservation for reservation in self._held.values()
+                if datetime.fromisoformat(reservation.end) >= horizon
+            ]
+            replace_file(
+                self.path, "".join(json.dumps(asdict(r)) + "\n" for r in held)
+            )
+            self._reset(os.stat(self.path).st_ino)
+            for reservation in held:
+                self._apply(reservation)
+            self._offset = os.path.getsize(self.path)
+
+    def iter_reservations(self) -> Iterator[Reservation]:
+        """Yields the reservations that are currently held."""
+        with self._guard:
+            self._catch_up()
+            reservations = list(self._held.values())
+        yield from reservations
+
+
+def parse_party_size(value: Any) -> int:
+    """Returns the number of people of a slot value, at least one."""
+    try:
+        return max(1, int(float(value)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def restaurant_capacities() -> Dict[str, int]:
+    return {r["name"]: r["capacity"] for r in get_seed(RESTAURANTS)}
+
+
+_ledger: Optional[ReservationLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_reservation_ledger() -> ReservationLedger:
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = ReservationLedger(
+                    DB_RESERVATIONS_PATH, restaurant_capacities()
+                )
+    return _ledger
+
+
+def compact_reservations() -> None:
+    get_reservation_ledger().compact()
@@ -0,0 +1,57 @@
+from typing import List
+
+from rasa_sdk.events import EventType, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.interfaces import Action, Tracker
+from rasa_sdk.types import DomainDict
+
+from actions.check_restaurant_availability import requested_table
+from actions.db import run_in_db_executor
+from actions.instrumentation import instrumented
+from actions.reservations import RESERVATION_DURATION, get_reservation_ledger
+
+
+@instrumented
+class ReserveRestaurant(Action):
+    """Books the table of the booking slots after the user confirmed it.
+
+    The seats may have been taken since `check_restaurant_availability`,
+    `book_restaurant_reservation_successful` tells the flow whether the
+    booking went through. Booking again replaces the table the conversation
+    holds at the restaurant.
+    """
+
+    def name(self) -> str:
+        return "reserve_restaurant"
+
+    async def run(
+            self,
+            dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: DomainDict,
+    ) -> List[EventType]:
+        restaurant_name, date, party_size = await requested_table(tracker)
+        if date is None:
+            return [SlotSet("book_restaurant_reservation_successful", False)]
+        reserved = await run_in_db_executor(
+            get_reservation_ledger().reserve, restaurant_name, date,
+            date + RESERVATION_DURATION, party_size, tracker.sender_id,
+        )
+        return [SlotSet("book_restaurant_reservation_successful", reserved)]
+
+
+@instrumented
+class CancelRestaurantReservation(Action):
+    """Gives up the tables the conversation holds, e.g. when the user cancels."""
+
+    def name(self) -> str:
+        return "cancel_restaurant_reservation"
+
+    async def run(
+            self,
+            dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: DomainDict,
+    ) -> List[EventType]:
+        await run_in_db_executor(get_reservation_ledger().release, tracker.sender_id)
+        return []
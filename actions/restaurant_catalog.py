@@ -0,0 +1,77 @@
+"""Precomputed lookups over the restaurant seed of `actions/db.py`.
+
+The restaurants are read-only and shared by all sessions, so the index is
+built once per process and only rebuilt when `get_seed` reloads the seed
+after the seed file changed.
+"""
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from actions.storage import RESTAURANTS, get_seed
+
+
+@dataclass(frozen=True)
+class RestaurantCatalog:
+    # lowercase city -> cuisines served in that city
+    cuisines_by_city: Mapping[str, Tuple[str, ...]]
+    # (lowercase city, lowercase cuisine) -> restaurant names
+    names_by_city_and_cuisine: Mapping[Tuple[str, str], Tuple[str, ...]]
+    # lowercase cuisines and restaurant names of the whole catalog
+    cuisines: FrozenSet[str]
+    names: FrozenSet[str]
+
+    def cuisines_in(self, city: str) -> Tuple[str, ...]:
+        return self.cuisines_by_city.get(city.lower(), ())
+
+    def restaurant_names(self, city: str, cuisine: str) -> Tuple[str, ...]:
+        return self.names_by_city_and_cuisine.get((city.lower(), cuisine.lower()), ())
+
+    def has_cuisine(self, cuisine: str) -> bool:
+        return cuisine.lower() in self.cuisines
+
+    def has_restaurant(self, name: str) -> bool:
+        return name.lower() in self.names
+
+
+def build_catalog(restaurants: Any) -> RestaurantCatalog:
+    # dicts keep the first occurrence of every value in seed order
+    cuisines_by_city: Dict[str, Dict[str, None]] = {}
+    names_by_key: Dict[Tuple[str, str], Dict[str, None]] = {}
+    for restaurant in restaurants:
+        city = restaurant["city"].lower()
+        cuisine = restaurant["cuisine"]
+        cuisines_by_city.setdefault(city, {})[cuisine] = None
+        key = (city, cuisine.lower())
+        names_by_key.setdefault(key, {})[restaurant["name"]] = None
+
+    return RestaurantCatalog(
+        cuisines_by_city=MappingProxyType(
+            {city: tuple(values) for city, values in cuisines_by_city.items()}
+        ),
+        names_by_city_and_cuisine=MappingProxyType(
+            {key: tuple(values) for key, values in names_by_key.items()}
+        ),
+        cuisines=frozenset(r["cuisine"].lower() for r in restaurants),
+        names=frozenset(r["name"].lower() for r in restaurants),
+    )
+
+
+_catalog: Optional[Tuple[Any, RestaurantCatalog]] = None
+_catalog_lock = threading.Lock()
+
+
+def get_restaurant_catalog() -> RestaurantCatalog:
+    """Returns the catalog index of the restaurant seed."""
+    global _catalog
+    seed = get_seed(RESTAURANTS)
+    cached = _catalog
+    if cached is None or cached[0] is not seed:
+        with _catalog_lock:
+            cached = _catalog
+            if cached is None or cached[0] is not seed:
+                cached = (seed, build_catalog(seed))
+                _catalog = cached
+    return cached[1]
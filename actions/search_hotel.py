@@ -3,8 +3,10 @@ from rasa_sdk.events import EventType, SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 from typing import List
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class SearchHotelAction(Action):
     def name(self) -> str:
         return "action_search_hotel"
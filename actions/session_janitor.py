@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from actions.storage import SessionStore
+
+logger = logging.getLogger(__name__)
+
+DB_SESSION_TTL_SECONDS = float(os.environ.get("DB_SESSION_TTL_SECONDS", 24 * 60 * 60))
+DB_DISK_QUOTA_BYTES = int(os.environ.get("DB_DISK_QUOTA_BYTES", 0))
+DB_JANITOR_INTERVAL_SECONDS = float(os.environ.get("DB_JANITOR_INTERVAL_SECONDS", 300))
+
+
+@dataclass
+class JanitorReport:
+    evicted_sessions: int = 0
+    reclaimed_bytes: int = 0
+
+
+class SessionJanitor:
+    """Removes stored sessions that are idle or exceed the disk quota.
+
+    Sessions that were not accessed for `ttl` seconds are deleted. If the
+    remaining sessions still take up more than `quota` bytes, the least
+    recently accessed ones are deleted until the quota is met. A `ttl` or
+    `quota` of `0` disables the respective rule. The `tasks` run after every
+    pass, e.g. to compact shared files.
+    """
+
+    def __init__(
+        self,
+        get_store: Callable[[], SessionStore],
+        ttl: float = DB_SESSION_TTL_SECONDS,
+        quota: int = DB_DISK_QUOTA_BYTES,
+        interval: float = DB_JANITOR_INTERVAL_SECONDS,
+        on_evict: Optional[Callable[[str], None]] = None,
+        tasks: Sequence[Callable[[], None]] = (),
+    ) -> None:
+        self.get_store = get_store
+        self.ttl = ttl
+        self.quota = quota
+        self.interval = interval
+        self.on_evict = on_evict
+        self.tasks = tasks
+        self.total = JanitorReport()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 or self.quota > 0
+
+    def run_once(self, now: Optional[float] = None) -> JanitorReport:
+        now = time.time() if now is None else now
+        store = self.get_store()
+        report = JanitorReport()
+        sessions = sorted(store.list_sessions(), key=lambda s: s.last_access)
+        total_size = sum(session.size for session in sessions)
+
+        for session in sessions:
+            expired = self.ttl > 0 and now - session.last_access > self.ttl
+            over_quota = 0 < self.quota < total_size
+            if not expired and not over_quota:
+                # sessions are sorted by last access, all others are newer
+                break
+            # the session must not have been touched since it was listed
+            reclaimed = store.delete_session(session.session_id, session.last_access)
+            if reclaimed is None:
+                continue
+            total_size -= session.size
+            report.evicted_sessions += 1
+            report.reclaimed_bytes += reclaimed
+            if self.on_evict is not None:
+                self.on_evict(session.session_id)
+
+        self.total.evicted_sessions += report.evicted_sessions
+        self.total.reclaimed_bytes += report.reclaimed_bytes
+        if report.evicted_sessions:
+            logger.info(
+                f"Evicted {report.evicted_sessions} sessions and reclaimed "
+                f"{report.reclaimed_bytes} bytes."
+            )
+        for task in self.tasks:
+            try:
+                task()
+            except Exception:
+                logger.exception(f"Failed to run janitor task {task.__name__}.")
+        return report
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="session-janitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Failed to clean up stored sessions.")
@@ -1,39 +1,16 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List
 
-from rasa.shared.nlu.training_data.message import Message
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import EventType, SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 
-from actions.entity_extractor import duckling_entity_extractor
-
-
-def parse_datetime(text: str) -> Optional[datetime]:
-    # If the text is already a date slot value extracted from Duckling,
-    # we can just use it
-    try:
-        result = datetime.fromisoformat(text)
-        return result.replace(tzinfo=None)
-    except ValueError:
-        pass
-
-    # Otherwise, we need to parse the value set by the LLM
-    # using Duckling
-    msg = Message.build(text)
-    duckling_entity_extractor.process([msg])
-    if len(msg.data.get("entities", [])) == 0:
-        return None
-
-    parsed_value = msg.data["entities"][0]["value"]
-    if isinstance(parsed_value, dict):
-        parsed_value = parsed_value["from"]
-
-    result = datetime.fromisoformat(parsed_value)
-    return result.replace(tzinfo=None)
+from actions.datetime_parsing import parse_datetime
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ValidatePaymentStartDate(Action):
     def name(self) -> str:
         return "validate_recurrent_payment_start_date"
@@ -57,6 +34,7 @@ class ValidatePaymentStartDate(Action):
         return [SlotSet("recurrent_payment_start_date", start_date.strftime("%Y-%m-%d"))]
 
 
+@instrumented
 class ValidatePaymentEndDate(Action):
     def name(self) -> str:
         return "validate_recurrent_payment_end_date"
@@ -84,6 +62,7 @@ class ValidatePaymentEndDate(Action):
         return [SlotSet("recurrent_payment_end_date", end_date.strftime("%Y-%m-%d"))]
 
 
+@instrumented
 class ExecutePayment(Action):
     def name(self) -> str:
         return "action_execute_recurrent_payment"
@@ -0,0 +1,385 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from actions.storage import (
+    BALANCE,
+    BALANCE_SNAPSHOTS,
+    CONTACTS,
+    MY_ACCOUNT,
+    PORTFOLIO_OPTIONS,
+    RESTAURANTS,
+    TRANSACTIONS,
+    SessionInfo,
+    SessionStore,
+    read_seed,
+)
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    columns: Tuple[str, ...]
+    single_row: bool = False
+    json_columns: Tuple[str, ...] = ()
+
+
+TABLES: Dict[str, TableSpec] = {
+    MY_ACCOUNT: TableSpec("accounts", ("account", "funds"), single_row=True),
+    CONTACTS: TableSpec("contacts", ("name", "handle")),
+    TRANSACTIONS: TableSpec(
+        "transactions", ("datetime", "recipient", "sender", "amount", "description")
+    ),
+    RESTAURANTS: TableSpec(
+        "restaurants", ("name", "address", "city", "cuisine", "capacity")
+    ),
+    PORTFOLIO_OPTIONS: TableSpec(
+        "portfolio_options", ("type", "options"), json_columns=("options",)
+    ),
+    BALANCE: TableSpec(
+        "balances", ("balance", "transactions", "datetime"), single_row=True
+    ),
+    BALANCE_SNAPSHOTS: TableSpec(
+        "balance_snapshots", ("transactions", "datetime", "balance")
+    ),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_tables (
+    session_id TEXT NOT NULL,
+    db TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, db)
+) WITHOUT ROWID;
+-- versions are drawn from one sequence that never goes back, not even when
+-- sessions are deleted, so a table never gets a version it had before
+CREATE TABLE IF NOT EXISTS version_sequence (
+    version INTEGER PRIMARY KEY AUTOINCREMENT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    account TEXT NOT NULL,
+    funds NUMERIC NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    handle TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS restaurants (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    city TEXT NOT NULL,
+    cuisine TEXT NOT NULL,
+    capacity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS portfolio_options (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    options TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balances (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    balance NUMERIC NOT NULL,
+    transactions INTEGER NOT NULL,
+    datetime TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    transactions INTEGER NOT NULL,
+    datetime TEXT NOT NULL,
+    balance NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+CREATE UNIQUE INDEX IF NOT EXISTS accounts_session_id ON accounts (session_id);
+CREATE INDEX IF NOT EXISTS contacts_session_id_handle
+    ON contacts (session_id, handle);
+CREATE INDEX IF NOT EXISTS transactions_session_id_datetime
+    ON transactions (session_id, datetime);
+CREATE INDEX IF NOT EXISTS restaurants_session_id_city_cuisine
+    ON restaurants (session_id, city, cuisine);
+CREATE INDEX IF NOT EXISTS portfolio_options_session_id
+    ON portfolio_options (session_id);
+CREATE UNIQUE INDEX IF NOT EXISTS balances_session_id ON balances (session_id);
+CREATE INDEX IF NOT EXISTS balance_snapshots_session_id
+    ON balance_snapshots (session_id);
+"""
+
+
+class SqliteSessionStore(SessionStore):
+    """Keeps all sessions in a single SQLite database running in WAL mode.
+
+    Every worker thread gets its own connection, which is created on first
+    use and reused for all following calls. Connections are re-created after
+    a fork, as SQLite connections must not be shared between processes.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection.executescript(SCHEMA)
+        columns = {
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(session_tables)")
+        }
+        if "version" not in columns:
+            self.connection.execute(
+                "ALTER TABLE session_tables ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        with self._transaction() as connection:
+            started = connection.execute(
+                "SELECT 1 FROM sqlite_sequence WHERE name = 'version_sequence'"
+            ).fetchone()
+            if started is None:
+                # databases created before the sequence continue above the
+                # per-table versions they used
+                connection.execute(
+                    "INSERT INTO version_sequence (version) "
+                    "SELECT COALESCE(MAX(version), 0) FROM session_tables"
+                )
+                connection.execute("DELETE FROM version_sequence")
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def read(self, session_id: str, db: str) -> Any:
+        rows = list(self.iter_rows(session_id, db))
+        if TABLES[db].single_row:
+            return rows[0] if rows else None
+        return rows
+
+    def write(self, session_id: str, db: str, data: Any) -> None:
+        with self._transaction() as connection:
+            self._replace(connection, TABLES[db], session_id, db, data)
+
+    def append(self, session_id: str, db: str, item: Any) -> None:
+        with self._transaction() as connection:
+            self._append(connection, session_id, db, [item])
+
+    def apply(
+        self,
+        session_id: str,
+        writes: Dict[str, Any],
+        appends: Dict[str, List[Any]],
+    ) -> None:
+        with self.lock(session_id), self._transaction() as connection:
+            for db, data in writes.items():
+                self._replace(connection, TABLES[db], session_id, db, data)
+            for db, items in appends.items():
+                self._append(connection, session_id, db, items)
+
+    def stamp(self, session_id: str, db: str) -> Optional[Hashable]:
+        row = self.connection.execute(
+            "SELECT version FROM session_tables WHERE session_id = ? AND db = ?",
+            (session_id, db),
+        ).fetchone()
+        return row[0] if row else None
+
+    def lock_file(self, session_id: str) -> str:
+        # sharded like the lock files of the JSON store, the file is removed
+        # again when the session is deleted
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, f".{name}.locks", digest[:2], f"{digest}.lock")
+
+    def touch(self, session_id: str) -> None:
+        self.connection.execute(
+            "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+            (time.time(), session_id),
+        )
+
+    def list_sessions(self) -> Iterator[SessionInfo]:
+        connection = self.connection
+        rows = connection.execute(
+            "SELECT session_id, last_access FROM sessions ORDER BY last_access"
+        ).fetchall()
+        for session_id, last_access in rows:
+            yield SessionInfo(
+                session_id, last_access, self._session_size(connection, session_id)
+            )
+
+    def delete_session(self, session_id: str, idle_since: float) -> Optional[int]:
+        with self.lock(session_id):
+            with self._transaction() as connection:
+                row = connection.execute(
+                    "SELECT last_access FROM sessions WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                if row is None or row[0] > idle_since:
+                    return None
+                size = self._session_size(connection, session_id)
+                for table in [spec.name for spec in TABLES.values()] + [
+                    "session_tables", "sessions"
+                ]:
+                    connection.execute(
+                        f"DELETE FROM {table} WHERE session_id = ?", (session_id,)
+                    )
+            try:
+                os.remove(self.lock_file(session_id))
+            except FileNotFoundError:
+                pass
+        return size
+
+    @staticmethod
+    def _session_size(connection: sqlite3.Connection, session_id: str) -> int:
+        """Estimates the size of the rows of a session in bytes."""
+        return sum(
+            connection.execute(
+                f"SELECT COALESCE(SUM("
+                f"{' + '.join(f'LENGTH({column})' for column in spec.columns)}"
+                f"), 0) FROM {spec.name} WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()[0]
+            for spec in TABLES.values()
+        )
+
+    def iter_rows(self, session_id: str, db: str, start: int = 0) -> Iterator[Any]:
+        spec = TABLES[db]
+        connection = self.connection
+        if not self._is_seeded(connection, session_id, db):
+            seed = read_seed(db)
+            yield from itertools.islice([seed] if spec.single_row else seed, start, None)
+            return
+        cursor = connection.execute(
+            f"SELECT {', '.join(spec.columns)} FROM {spec.name} "
+            f"WHERE session_id = ? ORDER BY id LIMIT -1 OFFSET ?",
+            (session_id, start),
+        )
+        for values in cursor:
+            row = dict(zip(spec.columns, values))
+            for column in spec.json_columns:
+                row[column] = json.loads(row[column])
+            yield row
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @classmethod
+    def _append(
+        cls,
+        connection: sqlite3.Connection,
+        session_id: str,
+        db: str,
+        items: List[Any],
+    ) -> None:
+        spec = TABLES[db]
+        if cls._is_seeded(connection, session_id, db):
+            cls._insert(connection, spec, session_id, items)
+            cls._bump_version(connection, session_id, db)
+        else:
+            # the first write of a session copies the seed rows it builds upon
+            cls._replace(connection, spec, session_id, db, read_seed(db) + items)
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection, session_id: str, db: str) -> None:
+        version = connection.execute(
+            "INSERT INTO version_sequence DEFAULT VALUES"
+        ).lastrowid
+        connection.execute("DELETE FROM version_sequence")
+        connection.execute(
+            "INSERT INTO session_tables (session_id, db, version) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id, db) DO UPDATE SET version = excluded.version",
+            (session_id, db, version),
+        )
+        connection.execute(
+            "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET last_access = excluded.last_access",
+            (session_id, time.time()),
+        )
+
+    @staticmethod
+    def _is_seeded(connection: sqlite3.Connection, session_id: str, db: str) -> bool:
+        row = connection.execute(
+            "SELECT 1 FROM session_tables WHERE session_id = ? AND db = ?",
+            (session_id, db),
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _replace(
+        connection: sqlite3.Connection,
+        spec: TableSpec,
+        session_id: str,
+        db: str,
+        data: Any,
+    ) -> None:
+        connection.execute(
+            f"DELETE FROM {spec.name} WHERE session_id = ?", (session_id,)
+        )
+        SqliteSessionStore._insert(
+            connection, spec, session_id, [data] if spec.single_row else data
+        )
+        SqliteSessionStore._bump_version(connection, session_id, db)
+
+    @staticmethod
+    def _insert(
+        connection: sqlite3.Connection,
+        spec: TableSpec,
+        session_id: str,
+        items: List[Any],
+    ) -> None:
+        connection.executemany(
+            f"INSERT INTO {spec.name} (session_id, {', '.join(spec.columns)}) "
+            f"VALUES (?{', ?' * len(spec.columns)})",
+            [
+                (session_id,) + tuple(
+                    json.dumps(item[column]) if column in spec.json_columns
+                    else item[column]
+                    for column in spec.columns
+                )
+                for item in items
+            ],
+        )
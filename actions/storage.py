@@ -0,0 +1,619 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import (
+    Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+)
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+ORIGIN_DB_PATH = "db"
+CONTACTS = "contacts.json"
+TRANSACTIONS = "transactions.json"
+MY_ACCOUNT = "my_account.json"
+RESTAURANTS = "restaurants.json"
+PORTFOLIO_OPTIONS = "portfolio_options.json"
+BALANCE = "balance.json"
+BALANCE_SNAPSHOTS = "balance_snapshots.json"
+
+# tables that are stored as append-only JSONL ledgers by the JSON backend
+LEDGERS = {
+    TRANSACTIONS: "transactions.jsonl",
+    BALANCE_SNAPSHOTS: "balance_snapshots.jsonl",
+}
+# tables that are shared by all sessions and never written to
+READ_ONLY_DBS = frozenset({RESTAURANTS, PORTFOLIO_OPTIONS})
+# lock files of the JSON backend live apart from the session directories
+LOCK_DIR = ".locks"
+JOURNAL_FILE = ".journal"
+
+DB_BACKEND = os.environ.get("DB_BACKEND", "json")
+DB_SESSION_ROOT = os.environ.get(
+    "DB_SESSION_ROOT", os.path.join(tempfile.gettempdir(), "rasa-calm-demo")
+)
+# number of hash prefix directory levels above the session directories
+DB_SHARD_DEPTH = int(os.environ.get("DB_SHARD_DEPTH", 2))
+DB_SQLITE_PATH = os.environ.get(
+    "DB_SQLITE_PATH", os.path.join(DB_SESSION_ROOT, "sessions.sqlite3")
+)
+# how often the seed files are checked for changes
+SEED_CHECK_INTERVAL_SECONDS = 1.0
+
+
+# db -> (mtime and size of the seed file, seed, monotonic time of the last check)
+_seeds: Dict[str, Tuple[Tuple[int, int], Any, float]] = {}
+_seeds_lock = threading.Lock()
+
+
+def freeze(data: Any) -> Any:
+    if isinstance(data, dict):
+        return MappingProxyType({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    return data
+
+
+def thaw(data: Any) -> Any:
+    if isinstance(data, Mapping):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, tuple):
+        return [thaw(value) for value in data]
+    return data
+
+
+def read_json_file(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _seed_file_stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_seed(db: str) -> Any:
+    """Returns the seed data of a table as immutable shared state.
+
+    The seed files are loaded once and reloaded when their modification time
+    or size changes, which is checked at most every
+    `SEED_CHECK_INTERVAL_SECONDS`. The same object is returned until then,
+    so indexes built over a seed can compare it by identity. Lists are
+    returned as tuples and objects as read-only mappings.
+    """
+    now = time.monotonic()
+    entry = _seeds.get(db)
+    if entry is not None and now - entry[2] < SEED_CHECK_INTERVAL_SECONDS:
+        return entry[1]
+    path = os.path.join(ORIGIN_DB_PATH, db)
+    with _seeds_lock:
+        entry = _seeds.get(db)
+        if entry is not None and now - entry[2] < SEED_CHECK_INTERVAL_SECONDS:
+            return entry[1]
+        stamp = _seed_file_stamp(path)
+        if entry is not None and entry[0] == stamp:
+            seed = entry[1]
+        else:
+            seed = freeze(read_json_file(path))
+        _seeds[db] = (stamp, seed, now)
+    return seed
+
+
+def read_seed(db: str) -> Any:
+    """Returns a mutable copy of the seed data of a table."""
+    return thaw(get_seed(db))
+
+
+class SessionLocks:
+    """Reentrant per-session locks that also exclude other processes.
+
+    Every lock is an exclusive `flock` on a lock file, so it is shared by all
+    workers on the same host. A thread that already holds a lock can acquire
+    it again without blocking.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._fallback_locks: Dict[str, threading.Lock] = {}
+        self._fallback_guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, lock_file: str) -> Iterator[bool]:
+        """Holds the lock, yields whether it was acquired rather than re-entered."""
+        held = self._local.__dict__.setdefault("held", {})
+        if lock_file in held:
+            held[lock_file] += 1
+            try:
+                yield False
+            finally:
+                held[lock_file] -= 1
+            return
+
+        if fcntl is None:
+            with self._fallback_guard:
+                fallback_lock = self._fallback_locks.setdefault(
+                    lock_file, threading.Lock()
+                )
+            with fallback_lock:
+                held[lock_file] = 1
+                try:
+                    yield True
+                finally:
+                    del held[lock_file]
+            return
+
+        fd = self._acquire(lock_file)
+        held[lock_file] = 1
+        try:
+            yield True
+        finally:
+            del held[lock_file]
+            os.close(fd)
+
+    @staticmethod
+    def _acquire(lock_file: str) -> int:
+        while True:
+            os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+            fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # the lock file might have been removed together with its session
+            # while we were waiting, in that case lock the new file instead
+            try:
+                if os.fstat(fd).st_ino == os.stat(lock_file).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+
+@dataclass(frozen=True)
+class SessionInfo:
+    session_id: str
+    last_access: float
+    size: int
+
+
+class SessionStore(ABC):
+    """Storage backend for the per-session data used by the custom actions.
+
+    A backend stores one JSON-compatible value per `(session_id, db)` pair,
+    where `db` is one of the table names defined in this module. Tables a
+    session never wrote to are served from the seed data in `ORIGIN_DB_PATH`,
+    a session only gets its own copy of a table on its first write.
+    """
+
+    def __init__(self) -> None:
+        self.locks = SessionLocks()
+
+    @abstractmethod
+    def read(self, session_id: str, db: str) -> Any:
+        """Returns the data of a table for the given session."""
+
+    @abstractmethod
+    def write(self, session_id: str, db: str, data: Any) -> None:
+        """Replaces the data of a table for the given session."""
+
+    def append(self, session_id: str, db: str, item: Any) -> None:
+        """Appends a single row to a table for the given session."""
+        self.write(session_id, db, self.read(session_id, db) + [item])
+
+    def iter_rows(self, session_id: str, db: str, start: int = 0) -> Iterator[Any]:
+        """Iterates over the rows of a table for the given session.
+
+        `start` skips the given number of rows at the beginning of the table.
+        """
+        yield from itertools.islice(self.read(session_id, db), start, None)
+
+    def compact(self, session_id: str, db: str) -> None:
+        """Rewrites the storage of a table in its most compact form."""
+
+    @abstractmethod
+    def stamp(self, session_id: str, db: str) -> Optional[Hashable]:
+        """Returns a cheap value that changes whenever the table is written.
+
+        `None` means that the session still uses the seed data of the table.
+        """
+
+    @abstractmethod
+    def lock_file(self, session_id: str) -> str:
+        """Returns the path of the file used to lock the session."""
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        """Holds the exclusive lock of a session across threads and processes."""
+        with self.locks.hold(self.lock_file(session_id)):
+            yield
+
+    def apply(
+        self,
+        session_id: str,
+        writes: Dict[str, Any],
+        appends: Dict[str, List[Any]],
+    ) -> None:
+        """Applies a group of table writes and appends as one unit."""
+        with self.lock(session_id):
+            for db, data in writes.items():
+                self.write(session_id, db, data)
+            for db, items in appends.items():
+                for item in items:
+                    self.append(session_id, db, item)
+
+    @abstractmethod
+    def touch(self, session_id: str) -> None:
+        """Marks the session as recently accessed."""
+
+    @abstractmethod
+    def list_sessions(self) -> Iterator[SessionInfo]:
+        """Lists all sessions that have their own stored data."""
+
+    @abstractmethod
+    def delete_session(self, session_id: str, idle_since: float) -> Optional[int]:
+        """Deletes a session unless it was accessed after `idle_since`.
+
+        Returns the number of bytes reclaimed, `None` if nothing was deleted.
+        """
+
+    def close(self) -> None:
+        """Releases resources held by the backend."""
+
+
+class JsonSessionStore(SessionStore):
+    """Keeps every session as a directory of JSON files below `root`.
+
+    Session directories are spread over `shard_depth` levels of directories
+    named after two hex characters of the hash of the session id, e.g.
+    `root/3f/a2/<session_id>` for a depth of 2. This keeps directories small
+    even with millions of sessions. A depth of 0 stores all sessions directly
+    in `root`.
+    """
+
+    def __init__(
+        self, root: str = DB_SESSION_ROOT, shard_depth: int = DB_SHARD_DEPTH
+    ) -> None:
+        super().__init__()
+        self.root = root
+        self.shard_depth = shard_depth
+        # ledgers with lines that could not be decoded, compacted by the next
+        # holder of the session lock
+        self._damaged: Set[Tuple[str, str]] = set()
+        self._damaged_lock = threading.Lock()
+
+    def get_session_db_path(self, session_id: str) -> str:
+        return os.path.join(
+            self.root, *shard_prefix(session_id, self.shard_depth), session_id
+        )
+
+    def get_session_db_file(self, session_id: str, db: str) -> str:
+        return os.path.join(self.get_session_db_path(session_id), db)
+
+    def read(self, session_id: str, db: str) -> Any:
+        if db in LEDGERS:
+            return list(self.iter_rows(session_id, db))
+        try:
+            return read_json_file(self.get_session_db_file(session_id, db))
+        except FileNotFoundError:
+            return read_seed(db)
+
+    def write(self, session_id: str, db: str, data: Any) -> None:
+        os.makedirs(self.get_session_db_path(session_id), exist_ok=True)
+        if db in LEDGERS:
+            self._write_ledger(self.get_session_db_file(session_id, LEDGERS[db]), data)
+            return
+        replace_file(
+            self.get_session_db_file(session_id, db),
+            json.dumps(data, indent=2, ensure_ascii=False),
+        )
+
+    def append(self, session_id: str, db: str, item: Any) -> None:
+        if db not in LEDGERS:
+            super().append(session_id, db, item)
+            return
+        line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.prepare_ledger_file(session_id, db), "ab+") as f:
+            # a previous append may have been torn before its line break was
+            # written, make sure the new entry starts on a line of its own
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+
+    def iter_rows(self, session_id: str, db: str, start: int = 0) -> Iterator[Any]:
+        if db not in LEDGERS:
+            yield from super().iter_rows(session_id, db, start)
+            return
+        ledger_file = self.get_session_db_file(session_id, LEDGERS[db])
+        if not os.path.exists(ledger_file) and not self._migrate_legacy_ledger(
+            session_id, db
+        ):
+            yield from itertools.islice(read_seed(db), start, None)
+            return
+        with open(ledger_file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if start > 0:
+                    # skipped entries are not decoded
+                    start -= 1
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # either torn by a crashed writer or still being appended
+                    # by another one, readers never rewrite the ledger
+                    with self._damaged_lock:
+                        self._damaged.add((session_id, db))
+
+    def compact(self, session_id: str, db: str) -> None:
+        """Rewrites a ledger without the entries of torn or corrupted writes."""
+        if db not in LEDGERS:
+            return
+        ledger_file = self.get_session_db_file(session_id, LEDGERS[db])
+        with self.lock(session_id):
+            if not os.path.exists(ledger_file):
+                return
+            rows = []
+            with open(ledger_file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        continue
+            self._write_ledger(ledger_file, rows)
+
+    def stamp(self, session_id: str, db: str) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self.get_session_db_file(session_id, LEDGERS.get(db, db)))
+        except FileNotFoundError:
+            return None
+        # files are replaced on write, so the inode changes with every write
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def lock_file(self, session_id: str) -> str:
+        # kept out of the session directory, so that sessions that only read
+        # do not get a directory
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, LOCK_DIR, digest[:2], f"{digest}.lock")
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        lock_file = self.lock_file(session_id)
+        with self.locks.hold(lock_file) as acquired:
+            if acquired:
+                self._recover(session_id)
+                self._compact_damaged(session_id)
+            try:
+                yield
+            finally:
+                if acquired and not os.path.isdir(self.get_session_db_path(session_id)):
+                    # nothing was stored or the session was deleted, waiting
+                    # lockers notice the removal and lock a new file
+                    try:
+                        os.remove(lock_file)
+                    except FileNotFoundError:
+                        pass
+
+    def apply(
+        self,
+        session_id: str,
+        writes: Dict[str, Any],
+        appends: Dict[str, List[Any]],
+    ) -> None:
+        """Applies a group of writes through a journal.
+
+        The journal is persisted before any table is touched and replayed by
+        the next holder of the session lock if the worker dies halfway. Ledger
+        appends record the ledger size they started from, so that replaying
+        them does not duplicate entries.
+        """
+        with self.lock(session_id):
+            os.makedirs(self.get_session_db_path(session_id), exist_ok=True)
+            journal = {"writes": dict(writes), "appends": []}
+            for db, items in appends.items():
+                if db in LEDGERS:
+                    ledger_file = self.prepare_ledger_file(session_id, db)
+                    journal["appends"].append({
+                        "db": db,
+                        "offset": os.path.getsize(ledger_file),
+                        "items": items,
+                    })
+                else:
+                    data = journal["writes"].get(db)
+                    if data is None:
+                        data = self.read(session_id, db)
+                    journal["writes"][db] = data + items
+            journal_file = self.get_session_db_file(session_id, JOURNAL_FILE)
+            replace_file(journal_file, json.dumps(journal, ensure_ascii=False), sync=True)
+            self._replay(session_id, journal)
+            os.remove(journal_file)
+
+    def _recover(self, session_id: str) -> None:
+        journal_file = self.get_session_db_file(session_id, JOURNAL_FILE)
+        try:
+            with open(journal_file, encoding="utf-8") as f:
+                journal = json.load(f)
+        except FileNotFoundError:
+            return
+        self._replay(session_id, journal)
+        os.remove(journal_file)
+
+    def _compact_damaged(self, session_id: str) -> None:
+        # runs under the session lock after the journal was replayed, so no
+        # append is in progress and no journal refers to ledger offsets
+        with self._damaged_lock:
+            damaged = [key for key in self._damaged if key[0] == session_id]
+            self._damaged.difference_update(damaged)
+        for _, db in damaged:
+            self.compact(session_id, db)
+
+    def _replay(self, session_id: str, journal: Dict[str, Any]) -> None:
+        for db, data in journal["writes"].items():
+            self.write(session_id, db, data)
+        for entry in journal["appends"]:
+            ledger_file = self.get_session_db_file(session_id, LEDGERS[entry["db"]])
+            with open(ledger_file, "r+b") as f:
+                f.truncate(entry["offset"])
+            for item in entry["items"]:
+                self.append(session_id, entry["db"], item)
+
+    def touch(self, session_id: str) -> None:
+        try:
+            os.utime(self.get_session_db_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def list_sessions(self) -> Iterator[SessionInfo]:
+        for session_id, _ in iter_session_dirs(self.root, self.shard_depth):
+            info = self._session_info(session_id)
+            if info is not None:
+                yield info
+
+    def migrate_layout(self, from_depth: int) -> int:
+        """Moves sessions stored with another shard depth to the current layout.
+
+        Must not run while action server workers use the store. Returns the
+        number of moved sessions.
+        """
+        moved = 0
+        for session_id, path in list(iter_session_dirs(self.root, from_depth)):
+            destination = self.get_session_db_path(session_id)
+            if os.path.abspath(path) == os.path.abspath(destination):
+                continue
+            if os.path.exists(destination):
+                raise FileExistsError(
+                    f"Can not migrate session '{session_id}', '{destination}' "
+                    f"already exists."
+                )
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.rename(path, destination)
+            moved += 1
+        return moved
+
+    def delete_session(self, session_id: str, idle_since: float) -> Optional[int]:
+        with self.lock(session_id):
+            info = self._session_info(session_id)
+            if info is None or info.last_access > idle_since:
+                return None
+            shutil.rmtree(self.get_session_db_path(session_id), ignore_errors=True)
+            return info.size
+
+    def _session_info(self, session_id: str) -> Optional[SessionInfo]:
+        session_db_path = self.get_session_db_path(session_id)
+        try:
+            last_access = os.stat(session_db_path).st_mtime
+            size = 0
+            for entry in os.scandir(session_db_path):
+                stat = entry.stat(follow_symlinks=False)
+                last_access = max(last_access, stat.st_mtime)
+                size += stat.st_size
+        except FileNotFoundError:
+            return None
+        return SessionInfo(session_id, last_access, size)
+
+    def prepare_ledger_file(self, session_id: str, db: str) -> str:
+        ledger_file = self.get_session_db_file(session_id, LEDGERS[db])
+        if os.path.exists(ledger_file) or self._migrate_legacy_ledger(session_id, db):
+            return ledger_file
+        os.makedirs(self.get_session_db_path(session_id), exist_ok=True)
+        self._write_ledger(ledger_file, read_seed(db))
+        return ledger_file
+
+    def _migrate_legacy_ledger(self, session_id: str, db: str) -> bool:
+        # sessions created before the table became a ledger keep their history
+        legacy_file = self.get_session_db_file(session_id, db)
+        if not os.path.exists(legacy_file):
+            return False
+        self._write_ledger(
+            self.get_session_db_file(session_id, LEDGERS[db]),
+            read_json_file(legacy_file),
+        )
+        os.remove(legacy_file)
+        return True
+
+    @staticmethod
+    def _write_ledger(ledger_file: str, rows: Iterable[Any]) -> None:
+        replace_file(
+            ledger_file,
+            "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+        )
+
+
+def shard_prefix(session_id: str, depth: int) -> List[str]:
+    digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+    return [digest[2 * level:2 * level + 2] for level in range(depth)]
+
+
+def iter_session_dirs(root: str, depth: int) -> Iterator[Tuple[str, str]]:
+    """Yields the ids and paths of the session directories of a layout."""
+    if depth == 0:
+        try:
+            entries = list(os.scandir(root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                continue
+            # shard directories only contain directories, sessions contain files
+            if _contains_files(entry.path):
+                yield entry.name, entry.path
+        return
+    try:
+        shards = [
+            entry.path for entry in os.scandir(root)
+            if len(entry.name) == 2 and entry.is_dir(follow_symlinks=False)
+        ]
+    except FileNotFoundError:
+        return
+    for shard in shards:
+        yield from iter_session_dirs(shard, depth - 1)
+
+
+def _contains_files(path: str) -> bool:
+    try:
+        return any(
+            not entry.is_dir(follow_symlinks=False) for entry in os.scandir(path)
+        )
+    except FileNotFoundError:
+        return False
+
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    backend = backend or DB_BACKEND
+    if backend == "json":
+        return JsonSessionStore()
+    if backend == "sqlite":
+        from actions.sqlite_storage import SqliteSessionStore
+
+        return SqliteSessionStore(DB_SQLITE_PATH)
+    raise ValueError(
+        f"Unknown db backend '{backend}'. Supported backends are 'json' and 'sqlite'."
+    )
+
+
+def replace_file(path: str, content: str, sync: bool = False) -> None:
+    """Atomically replaces the content of a file.
+
+    Readers see either the old or the new content, never a partial write.
+    """
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(content)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def estimate_size(data: Any) -> int:
+    return len(json.dumps(data, separators=(",", ":")))
@@ -1,17 +1,102 @@
-from typing import Any, Dict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db import get_transactions
+from actions.action_cache import amemoized
+from actions.db import TRANSACTIONS, aquery_transactions, parse_amount
+from actions.instrumentation import instrumented
 
+TRANSACTIONS_PAGE_SIZE = 10
+SEARCH_SLOTS = (
+    "transaction_search_start_date",
+    "transaction_search_end_date",
+    "transaction_search_recipient",
+    "transaction_search_min_amount",
+    "transaction_search_max_amount",
+    "transaction_search_page",
+)
 
+
+def _slot_datetime(tracker: Tracker, slot: str) -> Optional[datetime]:
+    value = tracker.get_slot(slot)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _slot_end_datetime(tracker: Tracker, slot: str) -> Optional[datetime]:
+    # a day without time includes that whole day, `end` is exclusive
+    end = _slot_datetime(tracker, slot)
+    if end is None:
+        return None
+    try:
+        date.fromisoformat(tracker.get_slot(slot))
+    except ValueError:
+        return end
+    return end + timedelta(days=1)
+
+
+def _slot_amount(tracker: Tracker, slot: str) -> Optional[float]:
+    value = tracker.get_slot(slot)
+    if value is None:
+        return None
+    return parse_amount(str(value))
+
+
+@instrumented
 class TransactionSearch(Action):
 
     def name(self) -> str:
         return "transaction_search"
 
-    def run(self, dispatcher: CollectingDispatcher,
+    async def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker, domain: Dict[str, Any]):
+        page = int(tracker.get_slot("transaction_search_page") or 0)
+
+        async def search():
+            result = await aquery_transactions(
+                tracker.sender_id,
+                start=_slot_datetime(tracker, "transaction_search_start_date"),
+                end=_slot_end_datetime(tracker, "transaction_search_end_date"),
+                recipient=tracker.get_slot("transaction_search_recipient"),
+                min_amount=_slot_amount(tracker, "transaction_search_min_amount"),
+                max_amount=_slot_amount(tracker, "transaction_search_max_amount"),
+                limit=TRANSACTIONS_PAGE_SIZE,
+                offset=page * TRANSACTIONS_PAGE_SIZE,
+            )
+            lines = [t.stringify() for t in result.transactions]
+            if lines and result.total > len(lines):
+                first = page * TRANSACTIONS_PAGE_SIZE + 1
+                lines.append(
+                    f"Showing {first}-{first + len(lines) - 1} of {result.total} transactions."
+                )
+            return "\n".join(lines), result.total
+
+        transactions_list, total = await amemoized(
+            self.name(), tracker.sender_id, [TRANSACTIONS],
+            tuple(repr(tracker.get_slot(slot)) for slot in SEARCH_SLOTS), search,
+        )
+        return [
+            SlotSet("transactions_list", transactions_list),
+            SlotSet("transactions_total", total),
+            SlotSet(
+                "transaction_search_has_more",
+                (page + 1) * TRANSACTIONS_PAGE_SIZE < total,
+            ),
+        ]
+
+
+@instrumented
+class TransactionSearchNextPage(Action):
+
+    def name(self) -> str:
+        return "transaction_search_next_page"
+
+    async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker, domain: Dict[str, Any]):
-        transactions = get_transactions(tracker.sender_id)
-        transactions_list = "\n".join([t.stringify() for t in transactions])
-        return [SlotSet("transactions_list", transactions_list)]
+        page = int(tracker.get_slot("transaction_search_page") or 0)
+        return [SlotSet("transaction_search_page", page + 1)]
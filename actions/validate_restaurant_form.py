@@ -4,9 +4,11 @@ from rasa_sdk import Tracker, FormValidationAction
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 
-from actions.db import get_restaurants
+from actions.restaurant_catalog import get_restaurant_catalog
+from actions.instrumentation import instrumented
 
 
+@instrumented
 class ValidateRestaurantForm(FormValidationAction):
     def name(self) -> Text:
         return "validate_restaurant_form"
@@ -19,13 +21,7 @@ class ValidateRestaurantForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate cuisine value."""
-        restaurants = get_restaurants(tracker.sender_id)
-        cuisine_list = set([
-            r.cuisine.lower()
-            for r in restaurants
-        ])
-
-        if slot_value.lower() in cuisine_list:
+        if get_restaurant_catalog().has_cuisine(slot_value):
             return {"cuisine": slot_value}
         else:
             return {"cuisine": None}
@@ -38,13 +34,7 @@ class ValidateRestaurantForm(FormValidationAction):
         domain: DomainDict,
     ) -> Dict[Text, Any]:
         """Validate restaurant name."""
-        restaurants = get_restaurants(tracker.sender_id)
-        restaurant_names = set([
-            r.name.lower()
-            for r in restaurants
-        ])
-
-        if slot_value.lower() in restaurant_names:
+        if get_restaurant_catalog().has_restaurant(slot_value):
             return {"restaurant_name": slot_value}
         else:
             return {"restaurant_name": None}
@@ -0,0 +1,267 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+KEY_BYTES = 16
+# slots probed after the home slot of a key before a slot is overwritten
+MAX_PROBES = 8
+
+
+def text_key(text: str, kind: str = "document") -> bytes:
+    # some models embed queries and documents differently
+    data = f"{kind}\0{text}".encode("utf-8")
+    return hashlib.sha256(data).digest()[:KEY_BYTES]
+
+
+class DiskEmbeddingStore:
+    """Fixed-size hash table of float32 vectors in memory-mapped files.
+
+    Keys are the first bytes of the SHA-256 of the text, stored in a
+    `.keys` file next to a `.vectors` matrix with one row per slot. Lookups
+    probe a few slots after the home slot of a key. When all of them are
+    taken, the home slot is overwritten. Writers of all processes exclude
+    each other with a file lock, clear the key of an overwritten slot and
+    write the vector before its key. Readers take no lock: they copy the
+    vector and check the key again afterwards, a slot that was overwritten
+    in the meantime is a miss.
+    """
+
+    def __init__(self, path: str, dimensions: int, capacity: int) -> None:
+        self.dimensions = dimensions
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock_file = path + ".lock"
+        self.keys = self._open(path + ".keys", np.uint8, (capacity, KEY_BYTES))
+        self.vectors = self._open(path + ".vectors", np.float32, (capacity, dimensions))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _open(path: str, dtype: type, shape: Tuple[int, int]) -> np.memmap:
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            # new files are created sparse, filled with zeros
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _slots(self, key: bytes) -> Iterator[int]:
+        home = int.from_bytes(key[:8], "little") % self.capacity
+        for probe in range(MAX_PROBES + 1):
+            yield (home + probe) % self.capacity
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        expected = np.frombuffer(key, dtype=np.uint8)
+        for slot in self._slots(key):
+            stored = np.array(self.keys[slot])
+            if np.array_equal(stored, expected):
+                vector = np.array(self.vectors[slot])
+                if not np.array_equal(self.keys[slot], expected):
+                    # overwritten while the vector was copied
+                    return None
+                return vector.tolist()
+            if not stored.any():
+                return None
+        return None
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def put(self, key: bytes, vector: List[float]) -> None:
+        if len(vector) != self.dimensions:
+            return
+        expected = np.frombuffer(key, dtype=np.uint8)
+        with self._locked():
+            target = None
+            for slot in self._slots(key):
+                stored = self.keys[slot]
+                if np.array_equal(stored, expected):
+                    return
+                if not stored.any():
+                    target = slot
+                    break
+            if target is None:
+                target = next(self._slots(key))
+                self.keys[target] = 0
+            self.vectors[target] = vector
+            self.keys[target] = expected
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that remember the vectors of the texts they embedded.
+
+    Vectors are kept in an in-process LRU tier of `max_entries` texts and,
+    if a `path` is given, in a `DiskEmbeddingStore` shared by restarts and
+    by all workers on the host. `namespace` separates the vectors of
+    different embedding models in the same directory.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_entries: int = 4096,
+        path: Optional[str] = None,
+        capacity: int = 65536,
+        namespace: Optional[str] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.path = path
+        self.capacity = capacity
+        self.namespace = namespace or _namespace(embeddings)
+        self._memory: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._disk: Optional[DiskEmbeddingStore] = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_store(self, dimensions: int) -> Optional[DiskEmbeddingStore]:
+        if self.path is None:
+            return None
+        if self._disk is None:
+            with self._lock:
+                if self._disk is None:
+                    self._disk = DiskEmbeddingStore(
+                        os.path.join(self.path, f"{self.namespace}-{dimensions}d"),
+                        dimensions,
+                        self.capacity,
+                    )
+        return self._disk
+
+    def _lookup(self, key: bytes) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+        # the dimensions are only known once the first vector is stored
+        disk = self._disk
+        vector = disk.get(key) if disk is not None else None
+        if vector is None and disk is None and self.path is not None:
+            vector = self._find_on_disk(key)
+        if vector is not None:
+            self._remember(key, vector)
+            with self._lock:
+                self.disk_hits += 1
+        return vector
+
+    def _find_on_disk(self, key: bytes) -> Optional[List[float]]:
+        prefix = f"{self.namespace}-"
+        if not os.path.isdir(self.path):
+            return None
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and name.endswith("d.vectors"):
+                dimensions = int(name[len(prefix):-len("d.vectors")])
+                return self._disk_store(dimensions).get(key)
+        return None
+
+    def _remember(self, key: bytes, vector: List[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: bytes, vector: List[float]) -> None:
+        self._remember(key, vector)
+        disk = self._disk_store(len(vector))
+        if disk is not None:
+            disk.put(key, vector)
+
+    def _split(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[int]]:
+        vectors = [self._lookup(text_key(text)) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        with self._lock:
+            self.misses += len(missing)
+        return vectors, missing
+
+    def _fill(
+        self,
+        texts: List[str],
+        vectors: List[Optional[List[float]]],
+        missing: List[int],
+        embedded: List[List[float]],
+    ) -> List[List[float]]:
+        for index, vector in zip(missing, embedded):
+            self._store(text_key(texts[index]), vector)
+            vectors[index] = vector
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._split(texts)
+        embedded = (
+            self.embeddings.embed_documents([texts[i] for i in missing])
+            if missing else []
+        )
+        return self._fill(texts, vectors, missing, embedded)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._split(texts)
+        embedded = (
+            await self.embeddings.aembed_documents([texts[i] for i in missing])
+            if missing else []
+        )
+        return self._fill(texts, vectors, missing, embedded)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(text, "query")
+        vector = self._lookup(key)
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = text_key(text, "query")
+        vector = self._lookup(key)
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            vector = await self.embeddings.aembed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "saved_calls": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+def _namespace(embeddings: Embeddings) -> str:
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", "")
+    name = f"{type(embeddings).__name__}-{model}" if model else type(embeddings).__name__
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -0,0 +1,234 @@
+import glob
+import hashlib
+import json
+import os
+from typing import Text, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+
+from rasa.utils.endpoints import EndpointConfig
+from rasa.core.information_retrieval import (
+    SearchResultList,
+    InformationRetrieval,
+    InformationRetrievalException,
+)
+
+from addons.search_query import configure_search, prepare_search_query
+
+logger = structlog.get_logger()
+
+SEARCH_RESULTS = 4
+INDEX_FORMAT = 1
+
+
+class InMemoryInformationRetrievalException(InformationRetrievalException):
+    """Exception raised for errors in the in-memory vector store."""
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+        super().__init__()
+
+    def __str__(self) -> str:
+        return self.base_message + self.message + f"{self.__cause__}"
+
+
+def load_documents(
+    docs_folder: str, chunk_size: int = 1000, chunk_overlap: int = 20
+) -> List[Document]:
+    """Splits the `.txt` files of a folder into chunks, in file name order."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    documents = []
+    for path in sorted(glob.glob(os.path.join(docs_folder, "**", "*.txt"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        documents.extend(
+            splitter.create_documents([text], metadatas=[{"source": path}])
+        )
+    return documents
+
+
+def corpus_fingerprint(
+    docs_folder: str, chunk_size: int, chunk_overlap: int, model: str
+) -> str:
+    """Changes whenever the documents, the chunking or the embedding model change."""
+    digest = hashlib.sha256(f"{INDEX_FORMAT}\0{model}\0{chunk_size}\0{chunk_overlap}".encode())
+    for path in sorted(glob.glob(os.path.join(docs_folder, "**", "*.txt"), recursive=True)):
+        digest.update(b"\0" + os.path.relpath(path, docs_folder).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class VectorIndex:
+    """Documents and their unit length embeddings in one float32 matrix.
+
+    Row `i` of `vectors` is the embedding of `documents[i]`. A search scores
+    all rows with a single matrix-vector product, which is the cosine
+    similarity since the rows are normalized, and selects the top `k` with
+    `argpartition` before sorting only those.
+    """
+
+    def __init__(
+        self, documents: List[Document], vectors: np.ndarray, fingerprint: str = ""
+    ) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(documents), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.vectors = vectors / norms
+        self.documents = documents
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def from_documents(
+        cls, documents: List[Document], embeddings: Embeddings, fingerprint: str = ""
+    ) -> "VectorIndex":
+        vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+        return cls(documents, np.asarray(vectors, dtype=np.float32), fingerprint)
+
+    def save(self, path: str) -> None:
+        """Writes the index to an `.npz` file, atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                vectors=self.vectors,
+                texts=np.array([doc.page_content for doc in self.documents], dtype=str),
+                metadata=np.array(json.dumps([doc.metadata for doc in self.documents])),
+                fingerprint=np.array(self.fingerprint),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            documents = [
+                Document(page_content=str(text), metadata=meta)
+                for text, meta in zip(data["texts"], metadata)
+            ]
+            return cls(documents, data["vectors"], str(data["fingerprint"]))
+
+    def search(
+        self, embedding: Sequence[float], k: int, threshold: float = 0.0
+    ) -> List[Tuple[Document, float]]:
+        """Returns the `k` most similar documents with a score of at least `threshold`."""
+        if not self.documents or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.vectors @ query
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (self.documents[i], float(scores[i])) for i in top if scores[i] >= threshold
+        ]
+
+
+class InMemory_Store(InformationRetrieval):
+    def connect(
+        self,
+        config: EndpointConfig,
+    ) -> None:
+        """Load or build the index of the documents."""
+        params = config.kwargs
+        configure_search(self, params)
+        self.index = self.load_index(
+            docs_folder=str(params.get("docs_folder", "docs")),
+            index_path=params.get("index_path"),
+            chunk_size=int(params.get("chunk_size", 1000)),
+            chunk_overlap=int(params.get("chunk_overlap", 20)),
+        )
+
+    def load_index(
+        self,
+        docs_folder: str,
+        index_path: Optional[str],
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> VectorIndex:
+        """Loads the prebuilt index if it matches the documents, otherwise builds it.
+
+        A new index is saved to `index_path`, if given, for the next start.
+        """
+        fingerprint = corpus_fingerprint(
+            docs_folder, chunk_size, chunk_overlap, self.embeddings.namespace
+        )
+        if index_path and os.path.exists(index_path):
+            try:
+                index = VectorIndex.load(index_path)
+            except Exception as e:
+                logger.warning(
+                    "addons.in_memory_store.index_load_failed", path=index_path, error=str(e)
+                )
+            else:
+                if index.fingerprint == fingerprint:
+                    logger.info(
+                        "addons.in_memory_store.index_loaded",
+                        path=index_path,
+                        documents=len(index),
+                    )
+                    return index
+                logger.info("addons.in_memory_store.index_outdated", path=index_path)
+
+        documents = load_documents(docs_folder, chunk_size, chunk_overlap)
+        if not documents:
+            raise InMemoryInformationRetrievalException(
+                f"No documents found in '{docs_folder}'."
+            )
+        try:
+            index = VectorIndex.from_documents(documents, self.embeddings, fingerprint)
+        except Exception as e:
+            raise InMemoryInformationRetrievalException(
+                f"Failed to embed the documents in '{docs_folder}'. Encountered error: {e}"
+            ) from e
+        logger.info(
+            "addons.in_memory_store.index_built",
+            docs_folder=docs_folder,
+            documents=len(index),
+        )
+        if index_path:
+            index.save(index_path)
+        return index
+
+    async def _search(self, query: Text, threshold: float) -> List[Document]:
+        embedding = await self.embeddings.aembed_query(query)
+        return [doc for doc, _ in self.index.search(embedding, SEARCH_RESULTS, threshold)]
+
+    async def search(
+        self, query: Text, tracker_state: Dict[str, Any], threshold: float = 0.0
+    ) -> SearchResultList:
+        """Search for a document in the in-memory vector store.
+
+        Args:
+            query: The query to search for.
+            threshold: minimum similarity score to consider a document a match.
+
+        Returns:
+        A list of documents that match the query.
+        """
+        logger.debug("addons.in_memory_store.search", query=query, tracker_state=tracker_state)
+        query = await prepare_search_query(tracker_state, self.query_rewriter)
+        logger.debug("addons.in_memory_store.search", query=query)
+        try:
+            hits = await self._search(query, threshold)
+        except Exception as e:
+            raise InMemoryInformationRetrievalException(
+                f"Failed to search the in-memory vector store. Encountered error: {e}"
+            ) from e
+        logger.debug("addons.in_memory_store.embedding_cache", **self.embeddings.stats())
+        return SearchResultList.from_document_list(hits)
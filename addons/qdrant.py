@@ -1,22 +1,26 @@
-from typing import Text, Any, Dict
+import asyncio
+import time
+from typing import Text, Any, Dict, List, Optional, Tuple
 
 import structlog
 from langchain.vectorstores.qdrant import Qdrant
 from pydantic import ValidationError
 from qdrant_client import QdrantClient
-from cohere import Client as CohereClient
-from os import environ
 
 from rasa.utils.endpoints import EndpointConfig
-from rasa.shared.utils.llm import sanitize_message_for_prompt
 from rasa.core.information_retrieval import (
     SearchResultList,
     InformationRetrieval,
     InformationRetrievalException,
 )
 
+from addons.search_cache import SearchResultCache
+from addons.search_query import configure_search, prepare_search_query
+
 logger = structlog.get_logger()
 
+SEARCH_RESULTS = 4
+
 
 class PayloadNotFoundException(InformationRetrievalException):
     """Exception raised for errors in missing payloads."""
@@ -39,35 +43,6 @@ class QdrantInformationRetrievalException(InformationRetrievalException):
     def __str__(self) -> str:
         return self.base_message + self.message + f"{self.__cause__}"
 
-def prepare_search_query(tracker_state: Dict[str, Any]) -> str:
-    """Uses Cohere to generate a search query from the chat history.
-    Args:
-        tracker_state: The tracker state.
-    Returns:
-        The search query.
-    """
-    chat_history = []
-    last_user_message = ""
-    for event in tracker_state.get("events"):
-        if event.get("event") == "user":
-            last_user_message = sanitize_message_for_prompt(event.get("text"))
-            chat_history.append({"role": "USER", "message": last_user_message})
-        elif event.get("event") == "bot":
-            chat_history.append({"role": "CHATBOT", "message": event.get("text")})
-
-    # skip if COHERE_API_KEY is not set
-    if environ.get("COHERE_API_KEY") is None:
-        return last_user_message
-    
-    # get search queries from cohere
-    co = CohereClient(environ.get("COHERE_API_KEY"))
-    response = co.chat(chat_history=chat_history, message=last_user_message, search_queries_only=True)
-
-    if response.search_queries:
-        return response.search_queries[0].text
-    else:
-        return last_user_message
-
 
 class Qdrant_Store(InformationRetrieval):
     def connect(
@@ -76,25 +51,99 @@ class Qdrant_Store(InformationRetrieval):
     ) -> None:
         """Connect to the Qdrant system."""
         params = config.kwargs
+        configure_search(self, params)
+        self.qdrant_client = QdrantClient(
+            location=params.get("location"),
+            url=params.get("url"),
+            port=int(params.get("port", 6333)),
+            grpc_port=int(params.get("grpc_port", 6334)),
+            prefer_grpc=bool(params.get("prefer_grpc", False)),
+            https=bool(params.get("https")),
+            api_key=params.get("api_key"),
+            prefix=params.get("prefix"),
+            timeout=int(params.get("timeout", 5)),
+            host=params.get("host"),
+            path=params.get("path"),
+        )
+        self.collection_name = str(params.get("collection"))
         self.client = Qdrant(
-            client=QdrantClient(
-                location=params.get("location"),
-                url=params.get("url"),
-                port=int(params.get("port", 6333)),
-                grpc_port=int(params.get("grpc_port", 6334)),
-                prefer_grpc=bool(params.get("prefer_grpc", False)),
-                https=bool(params.get("https")),
-                api_key=params.get("api_key"),
-                prefix=params.get("prefix"),
-                timeout=int(params.get("timeout", 5)),
-                host=params.get("host"),
-                path=params.get("path"),
-            ),
-            collection_name=str(params.get("collection")),
+            client=self.qdrant_client,
+            collection_name=self.collection_name,
             embeddings=self.embeddings,
             content_payload_key=params.get("content_payload_key", "text"),
             metadata_payload_key=params.get("metadata_payload_key", "metadata"),
         )
+        self.search_cache = SearchResultCache(
+            max_entries=int(params.get("search_cache_size", 1024)),
+            ttl=float(params.get("search_cache_ttl", 300)),
+            max_distance=float(params.get("search_cache_max_distance", 0.0)),
+            max_semantic_entries=int(params.get("search_cache_semantic_size", 256)),
+        )
+        self.search_cache_version_interval = float(
+            params.get("search_cache_version_interval", 60)
+        )
+        self._version_checked_at = float("-inf")
+
+    def collection_version(self) -> Tuple[str, Optional[int]]:
+        """Returns the collection behind the configured name and its number of points.
+
+        `scripts/load-data-to-qdrant.py` loads every ingestion into a new
+        collection and points the configured name, an alias, at it, so the
+        version changes even if the number of points stays the same.
+        """
+        collection = next(
+            (
+                alias.collection_name
+                for alias in self.qdrant_client.get_aliases().aliases
+                if alias.alias_name == self.collection_name
+            ),
+            self.collection_name,
+        )
+        return collection, self.qdrant_client.get_collection(collection).points_count
+
+    async def check_collection_version(self) -> None:
+        """Clears the search cache if the collection was re-ingested or changed size."""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.search_cache_version_interval:
+            return
+        self._version_checked_at = now
+        try:
+            collection, points_count = await asyncio.to_thread(self.collection_version)
+        except Exception as e:
+            logger.warning("addons.qdrant_store.version_check_failed", error=str(e))
+            return
+        if self.search_cache.set_version((collection, points_count)):
+            logger.info(
+                "addons.qdrant_store.search_cache_invalidated",
+                collection=collection,
+                points_count=points_count,
+            )
+
+    async def _search(self, query: Text, threshold: float) -> List[Any]:
+        cache = self.search_cache
+        await self.check_collection_version()
+        hits = cache.get(query, SEARCH_RESULTS, threshold)
+        if hits is not None:
+            logger.debug("addons.qdrant_store.search_cache_hit", tier="exact")
+            return hits
+        if not cache.semantic:
+            hits = await self.client.asimilarity_search(
+                query, k=SEARCH_RESULTS, score_threshold=threshold
+            )
+            cache.put(query, SEARCH_RESULTS, threshold, hits)
+            return hits
+
+        # embed once, for the semantic lookup and for the search
+        embedding = await self.embeddings.aembed_query(query)
+        hits = cache.get_similar(embedding, SEARCH_RESULTS, threshold)
+        if hits is not None:
+            logger.debug("addons.qdrant_store.search_cache_hit", tier="semantic")
+            return hits
+        hits = await self.client.asimilarity_search_by_vector(
+            embedding, k=SEARCH_RESULTS, score_threshold=threshold
+        )
+        cache.put(query, SEARCH_RESULTS, threshold, hits, embedding)
+        return hits
 
     async def search(
         self, query: Text, tracker_state: Dict[str, Any], threshold: float = 0.0
@@ -109,12 +158,10 @@ class Qdrant_Store(InformationRetrieval):
         A list of documents that match the query.
         """
         logger.debug("addons.qdrant_store.search", query=query, tracker_state=tracker_state)
-        query = prepare_search_query(tracker_state)
+        query = await prepare_search_query(tracker_state, self.query_rewriter)
         logger.debug("addons.qdrant_store.search", query=query)
         try:
-            hits = await self.client.asimilarity_search(
-                query, k=4, score_threshold=threshold
-            )
+            hits = await self._search(query, threshold)
         except ValidationError as e:
             raise PayloadNotFoundException(
                 "Payload not found in the Qdrant response. Please make sure "
@@ -126,4 +173,6 @@ class Qdrant_Store(InformationRetrieval):
             raise QdrantInformationRetrievalException(
                 f"Failed to search the Qdrant vector store. Encountered error: {e}"
             ) from e
+        logger.debug("addons.qdrant_store.search_cache", **self.search_cache.stats())
+        logger.debug("addons.qdrant_store.embedding_cache", **self.embeddings.stats())
         return SearchResultList.from_document_list(hits)
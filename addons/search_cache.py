@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchResultCache:
+    """Two-tier cache of vector store search results.
+
+    The exact tier is keyed by the normalized query, `k` and the score
+    threshold. The optional semantic tier returns the results of a cached
+    query whose embedding is within `max_distance` cosine distance of the
+    new query embedding, for the same `k` and threshold; `0` disables it.
+    Entries of both tiers expire after `ttl` seconds and the least recently
+    used entries are evicted beyond the size limits. The cache is cleared
+    when the version of the underlying collection changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        max_distance: float = 0.0,
+        max_semantic_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_semantic_entries = max_semantic_entries
+        self.clock = clock
+        self.version: Optional[Hashable] = None
+        # key -> (expires at, results)
+        self._exact: "OrderedDict[Hashable, Tuple[float, List[Any]]]" = OrderedDict()
+        # key -> (expires at, unit embedding, results)
+        self._semantic: "OrderedDict[Hashable, Tuple[float, np.ndarray, List[Any]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.max_distance > 0 and self.max_semantic_entries > 0
+
+    @staticmethod
+    def key(query: str, k: int, threshold: float) -> Hashable:
+        return normalize_query(query), k, threshold
+
+    def get(self, query: str, k: int, threshold: float) -> Optional[List[Any]]:
+        """Returns the cached results of the same query, if there are any."""
+        key = self.key(query, k, threshold)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._exact.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[1]
+                del self._exact[key]
+                self.expirations += 1
+            if not self.semantic:
+                self.misses += 1
+            return None
+
+    def get_similar(
+        self, embedding: Sequence[float], k: int, threshold: float
+    ) -> Optional[List[Any]]:
+        """Returns the cached results of the closest similar query, if there is one."""
+        if not self.semantic:
+            return None
+        vector = _unit(embedding)
+        with self._lock:
+            now = self.clock()
+            for key in [key for key, entry in self._semantic.items() if entry[0] <= now]:
+                del self._semantic[key]
+                self.expirations += 1
+            candidates = [
+                key for key in self._semantic if key[1] == k and key[2] == threshold
+            ]
+            if candidates:
+                matrix = np.stack([self._semantic[key][1] for key in candidates])
+                distances = 1.0 - matrix @ vector
+                best = int(np.argmin(distances))
+                if distances[best] <= self.max_distance:
+                    key = candidates[best]
+                    self._semantic.move_to_end(key)
+                    self.semantic_hits += 1
+                    return self._semantic[key][2]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        query: str,
+        k: int,
+        threshold: float,
+        results: List[Any],
+        embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        key = self.key(query, k, threshold)
+        expires = self.clock() + self.ttl
+        with self._lock:
+            if self.max_entries > 0:
+                self._exact[key] = (expires, results)
+                self._exact.move_to_end(key)
+                while len(self._exact) > self.max_entries:
+                    self._exact.popitem(last=False)
+                    self.evictions += 1
+            if self.semantic and embedding is not None:
+                self._semantic[key] = (expires, _unit(embedding), results)
+                self._semantic.move_to_end(key)
+                while len(self._semantic) > self.max_semantic_entries:
+                    self._semantic.popitem(last=False)
+                    self.evictions += 1
+
+    def set_version(self, version: Hashable) -> bool:
+        """Clears the cache if the collection changed, returns whether it did."""
+        with self._lock:
+            if version == self.version:
+                return False
+            changed = self.version is not None
+            self.version = version
+            if changed:
+                self._exact.clear()
+                self._semantic.clear()
+                self.invalidations += 1
+            return changed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._exact),
+                "semantic_entries": len(self._semantic),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+def _unit(embedding: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
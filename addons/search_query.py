@@ -0,0 +1,167 @@
+import asyncio
+from collections import OrderedDict
+from os import environ
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from cohere import AsyncClient as CohereAsyncClient
+
+from rasa.shared.utils.llm import sanitize_message_for_prompt
+
+from addons.embedding_cache import CachedEmbeddings
+from addons.search_cache import normalize_query
+
+logger = structlog.get_logger()
+
+
+class QueryRewriter:
+    """Rewrites the last user message into a search query with Cohere.
+
+    Uses one long-lived async client. Calls that take longer than `timeout`
+    seconds or fail fall back to the user message. Rewritten queries are kept
+    in a bounded LRU cache keyed by the normalized chat history, so repeated
+    questions skip the rewrite call. Only the last `history_turns` user
+    messages and the bot messages in between, and at most about
+    `history_tokens` tokens of them, are sent; `0` disables either limit.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        timeout: float = 2.0,
+        cache_size: int = 1024,
+        history_turns: int = 10,
+        history_tokens: int = 0,
+    ) -> None:
+        self.client = CohereAsyncClient(api_key) if api_key else None
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.history_turns = history_turns
+        self.history_tokens = history_tokens
+        self._cache: "OrderedDict[Tuple[Tuple[str, str], ...], str]" = OrderedDict()
+
+    async def rewrite(
+        self, chat_history: List[Dict[str, str]], last_user_message: str
+    ) -> str:
+        if self.client is None:
+            return last_user_message
+        # the history ends with the last user message
+        key = tuple(
+            (entry["role"], normalize_query(entry["message"] or "")) for entry in chat_history
+        )
+        query = self._cache.get(key)
+        if query is not None:
+            self._cache.move_to_end(key)
+            return query
+
+        try:
+            response = await asyncio.wait_for(
+                self.client.chat(
+                    chat_history=chat_history,
+                    message=last_user_message,
+                    search_queries_only=True,
+                ),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("addons.search_query.rewrite_timeout", timeout=self.timeout)
+            return last_user_message
+        except Exception as e:
+            logger.warning("addons.search_query.rewrite_failed", error=str(e))
+            return last_user_message
+
+        if response.search_queries:
+            query = response.search_queries[0].text
+        else:
+            query = last_user_message
+        if self.cache_size > 0:
+            self._cache[key] = query
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return query
+
+
+def configure_search(store: Any, params: Dict[str, Any]) -> None:
+    """Sets up the embedding cache and the query rewriter of a vector store.
+
+    Called from the `connect` of the stores with the parameters of the
+    `vector_store` section in `endpoints.yml`.
+    """
+    store.embeddings = CachedEmbeddings(
+        store.embeddings,
+        max_entries=int(params.get("embedding_cache_size", 4096)),
+        path=params.get("embedding_cache_path"),
+        capacity=int(params.get("embedding_cache_capacity", 65536)),
+    )
+    # skips the rewriting if COHERE_API_KEY is not set
+    store.query_rewriter = QueryRewriter(
+        environ.get("COHERE_API_KEY"),
+        timeout=float(params.get("rewrite_timeout", 2.0)),
+        cache_size=int(params.get("rewrite_cache_size", 1024)),
+        history_turns=int(params.get("rewrite_history_turns", 10)),
+        history_tokens=int(params.get("rewrite_history_tokens", 0)),
+    )
+
+
+def _estimate_tokens(text: str) -> int:
+    # roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def extract_chat_history(
+    events: List[Dict[str, Any]], max_turns: int = 0, max_tokens: int = 0
+) -> Tuple[List[Dict[str, str]], str]:
+    """Returns the most recent messages of a conversation and the last user message.
+
+    The events are scanned from the end and the scan stops as soon as
+    `max_turns` user messages are collected or the messages would exceed
+    about `max_tokens` tokens, so the cost does not grow with the length of
+    the conversation. The last user message is always included. `0`
+    disables a limit.
+    """
+    chat_history = []
+    last_user_message = None
+    turns = 0
+    tokens = 0
+    for event in reversed(events):
+        event_type = event.get("event")
+        if event_type != "user" and event_type != "bot":
+            continue
+        if max_turns and turns == max_turns:
+            # the earlier bot messages belong to an older turn
+            break
+        if event_type == "user":
+            message = sanitize_message_for_prompt(event.get("text"))
+            role = "USER"
+        else:
+            message = event.get("text")
+            role = "CHATBOT"
+        if max_tokens:
+            tokens += _estimate_tokens(message or "")
+            if tokens > max_tokens and last_user_message is not None:
+                break
+        chat_history.append({"role": role, "message": message})
+        if role == "USER":
+            turns += 1
+            if last_user_message is None:
+                last_user_message = message
+    chat_history.reverse()
+    return chat_history, last_user_message or ""
+
+
+async def prepare_search_query(
+    tracker_state: Dict[str, Any], rewriter: Optional[QueryRewriter] = None
+) -> str:
+    """Uses Cohere to generate a search query from the recent chat history.
+    Args:
+        tracker_state: The tracker state.
+        rewriter: The query rewriter, a new one is created if not given.
+    Returns:
+        The search query.
+    """
+    if rewriter is None:
+        rewriter = QueryRewriter(environ.get("COHERE_API_KEY"))
+    chat_history, last_user_message = extract_chat_history(
+        tracker_state.get("events"), rewriter.history_turns, rewriter.history_tokens
+    )
+    return await rewriter.rewrite(chat_history, last_user_message)
@@ -0,0 +1,88 @@
+"""Compares extracting the full chat history with the bounded window.
+
+Builds synthetic tracker states of 10, 100 and 1,000 turns, each turn made
+of a user message, a few action and slot events and a bot message, and
+measures how long `prepare_search_query` in `addons/search_query.py` takes to
+extract the chat history from them. The full scan is the extraction used
+before the window, it visits and sanitizes every message of the
+conversation.
+
+Run from the root of the project, with the dependencies of the Qdrant
+addon installed:
+
+    python scripts/benchmark_chat_history.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from addons.search_query import extract_chat_history  # noqa: E402
+from rasa.shared.utils.llm import sanitize_message_for_prompt  # noqa: E402
+
+
+def synthetic_events(turns: int) -> List[Dict[str, Any]]:
+    events = []
+    for turn in range(turns):
+        events.extend([
+            {"event": "user", "text": f"What are the opening hours of branch {turn}?"},
+            {"event": "action", "name": "action_extract_slots"},
+            {"event": "slot", "name": "branch", "value": str(turn)},
+            {"event": "action", "name": "action_trigger_search"},
+            {"event": "bot", "text": f"Branch {turn} is open from 9am to 5pm."},
+            {"event": "action", "name": "action_listen"},
+        ])
+    return events
+
+
+def full_scan(events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], str]:
+    chat_history = []
+    last_user_message = ""
+    for event in events:
+        if event.get("event") == "user":
+            last_user_message = sanitize_message_for_prompt(event.get("text"))
+            chat_history.append({"role": "USER", "message": last_user_message})
+        elif event.get("event") == "bot":
+            chat_history.append({"role": "CHATBOT", "message": event.get("text")})
+    return chat_history, last_user_message
+
+
+def measure(func: Any, repeat: int) -> float:
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'turns':>6} {'full us':>10} {'window us':>10} {'speedup':>8} "
+        f"{'full msgs':>10} {'window msgs':>12}"
+    )
+    for turns in args.turns:
+        events = synthetic_events(turns)
+        full = measure(lambda: full_scan(events), args.repeat)
+        window = measure(
+            lambda: extract_chat_history(events, args.window, args.tokens),
+            args.repeat,
+        )
+        full_history, full_message = full_scan(events)
+        history, message = extract_chat_history(events, args.window, args.tokens)
+        assert message == full_message
+        assert history == full_history[-len(history):]
+        print(
+            f"{turns:>6} {full * 1e6:>10.1f} {window * 1e6:>10.1f} "
+            f"{full / window:>7.1f}x {len(full_history):>10} {len(history):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
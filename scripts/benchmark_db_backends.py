@@ -0,0 +1,79 @@
+"""Compares the JSON and SQLite session stores of `actions/db.py`.
+
+Simulates a number of sessions that each read their account and contacts,
+add a contact and a transaction and read the transactions back. The
+in-process session cache is disabled, so that the numbers reflect the cost
+of the storage backends themselves.
+
+Run from the root of the project:
+
+    python scripts/benchmark_db_backends.py --sessions 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import db  # noqa: E402
+from actions.sqlite_storage import SqliteSessionStore  # noqa: E402
+from actions.storage import JsonSessionStore, SessionStore  # noqa: E402
+
+
+def run_session(session_id: str) -> None:
+    db.get_account(session_id)
+    db.get_contacts(session_id)
+    db.add_contact(session_id, db.Contact(name="Benchmark", handle="@benchmark"))
+    db.add_transaction(
+        session_id,
+        db.Transaction(
+            datetime="2024-01-01T10:00:00", recipient="Joe", sender="self",
+            amount="10$", description="benchmark",
+        ),
+    )
+    db.get_transactions(session_id)
+
+
+def benchmark(store: SessionStore, sessions: int) -> Dict[str, float]:
+    db.set_session_store(store)
+    db.session_cache.max_sessions = 0
+
+    def timed(step: Callable[[str], None]) -> float:
+        start = time.perf_counter()
+        for i in range(sessions):
+            step(f"benchmark-{i}")
+        return time.perf_counter() - start
+
+    results = {
+        "first visit": timed(run_session),
+        "returning visit": timed(run_session),
+    }
+    store.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stores = {
+            "json": JsonSessionStore(os.path.join(workdir, "json")),
+            "sqlite": SqliteSessionStore(os.path.join(workdir, "sessions.sqlite3")),
+        }
+        print(f"{'backend':<8} {'phase':<16} {'total (s)':>10} {'per session (ms)':>17}")
+        for name, store in stores.items():
+            for phase, seconds in benchmark(store, args.sessions).items():
+                print(
+                    f"{name:<8} {phase:<16} {seconds:>10.2f} "
+                    f"{seconds / args.sessions * 1000:>17.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Measures how much the storage calls of `actions/db.py` stall the event loop.
+
+Runs a number of concurrent conversations on one event loop, each of which
+reads its account and contacts, adds a transaction and reads the
+transactions back. The conversations either call the blocking helpers
+directly, as synchronous actions do, or await their async counterparts.
+A monitor task sleeps for one millisecond at a time and records how late
+it wakes up, which is the time the event loop was blocked.
+
+Run from the root of the project:
+
+    python scripts/benchmark_db_event_loop.py --conversations 200 --turns 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import db  # noqa: E402
+from actions.storage import JsonSessionStore  # noqa: E402
+
+MONITOR_INTERVAL = 0.001
+
+
+def new_transaction() -> db.Transaction:
+    return db.Transaction(
+        datetime="2024-01-01T10:00:00", recipient="Joe", sender="self",
+        amount="10$", description="benchmark",
+    )
+
+
+async def blocking_turn(session_id: str) -> None:
+    db.get_account(session_id)
+    await asyncio.sleep(0)
+    db.get_contacts(session_id)
+    await asyncio.sleep(0)
+    db.add_transaction(session_id, new_transaction())
+    await asyncio.sleep(0)
+    db.get_transactions(session_id)
+
+
+async def async_turn(session_id: str) -> None:
+    await db.aget_account(session_id)
+    await db.aget_contacts(session_id)
+    await db.aadd_transaction(session_id, new_transaction())
+    await db.aget_transactions(session_id)
+
+
+async def monitor(lags: List[float], stopped: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stopped.is_set():
+        start = loop.time()
+        await asyncio.sleep(MONITOR_INTERVAL)
+        lags.append(max(0.0, loop.time() - start - MONITOR_INTERVAL))
+
+
+async def run(mode: str, conversations: int, turns: int) -> Dict[str, float]:
+    turn = blocking_turn if mode == "blocking" else async_turn
+    lags: List[float] = []
+    stopped = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor(lags, stopped))
+
+    async def conversation(index: int) -> None:
+        for _ in range(turns):
+            await turn(f"{mode}-{index}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(conversations)))
+    elapsed = time.perf_counter() - start
+    stopped.set()
+    await monitor_task
+
+    lags.sort()
+    return {
+        "turns/s": conversations * turns / elapsed,
+        "max stall (ms)": lags[-1] * 1000,
+        "p99 stall (ms)": lags[int(len(lags) * 0.99)] * 1000,
+        "mean stall (ms)": statistics.mean(lags) * 1000,
+        "stalled (%)": sum(lags) / elapsed * 100,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db.set_session_store(JsonSessionStore(workdir))
+        db.session_cache.max_sessions = 0
+        results = {
+            mode: asyncio.run(run(mode, args.conversations, args.turns))
+            for mode in ("blocking", "async")
+        }
+
+    print(f"{'':<16}" + "".join(f"{mode:>12}" for mode in results))
+    for metric in results["blocking"]:
+        print(
+            f"{metric:<16}"
+            + "".join(f"{values[metric]:>12.2f}" for values in results.values())
+        )
+
+
+if __name__ == "__main__":
+    main()
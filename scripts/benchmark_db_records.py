@@ -0,0 +1,77 @@
+"""Compares the pydantic models and the compact records of `actions/db.py`.
+
+Decodes the rows of every table into pydantic models and into the records
+of `actions/records.py` and encodes them back with `dict()`. Reports the
+time per row and the memory held by the decoded objects.
+
+Run from the root of the project:
+
+    python scripts/benchmark_db_records.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import db, records  # noqa: E402
+from actions.storage import MY_ACCOUNT, read_seed  # noqa: E402
+
+
+def sample_rows(table: str, rows: int) -> List[Dict[str, Any]]:
+    seed = read_seed(table)
+    seed = [seed] if table == MY_ACCOUNT else seed
+    return [dict(seed[i % len(seed)]) for i in range(rows)]
+
+
+def measure(
+    decode: Callable[[List[Dict[str, Any]]], List[Any]], rows: List[Dict[str, Any]]
+) -> Tuple[float, float, int]:
+    start = time.perf_counter()
+    decoded = decode(rows)
+    decode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for item in decoded:
+        item.dict()
+    encode_seconds = time.perf_counter() - start
+
+    del decoded
+    tracemalloc.start()
+    decoded = decode(rows)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return decode_seconds, encode_seconds, memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    decoders = {
+        "pydantic": lambda table: lambda rows: [db.MODELS[table](**r) for r in rows],
+        "records": lambda table: lambda rows: records.decode_rows(table, rows),
+    }
+    print(
+        f"{'table':<22} {'types':<9} {'decode (us)':>12} {'encode (us)':>12} "
+        f"{'bytes/row':>10}"
+    )
+    for table in records.RECORD_TYPES:
+        rows = sample_rows(table, args.rows)
+        for name, decoder in decoders.items():
+            decode_seconds, encode_seconds, memory = measure(decoder(table), rows)
+            print(
+                f"{table:<22} {name:<9} "
+                f"{decode_seconds / args.rows * 1e6:>12.3f} "
+                f"{encode_seconds / args.rows * 1e6:>12.3f} "
+                f"{memory / args.rows:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
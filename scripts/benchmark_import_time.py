@@ -0,0 +1,94 @@
+"""Measures how long the action server takes to import the actions package.
+
+Every run imports all modules of `actions`, like `rasa run actions` does on
+startup, in a fresh interpreter started with `python -X importtime`. Reports
+the wall clock time of the import and the top level packages and modules
+with the largest cumulative import time. With `--max-ms` the script fails
+if the median import time exceeds the given limit, e.g. in CI.
+
+Run from the root of the project:
+
+    python scripts/benchmark_import_time.py --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ACTIONS = """
+import importlib, pkgutil, time
+start = time.perf_counter()
+import actions
+for module in pkgutil.walk_packages(actions.__path__, "actions."):
+    importlib.import_module(module.name)
+print(time.perf_counter() - start)
+"""
+
+
+def run_once() -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Returns the import time in seconds and the self and cumulative time per module in us."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_ACTIONS],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def by_package(modules: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Sums the self time of the modules per top level package."""
+    packages: Dict[str, int] = defaultdict(int)
+    for name, own, _ in modules:
+        packages[name.split(".")[0]] += own
+    return packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        seconds, modules = run_once()
+        timings.append(seconds)
+    median_ms = statistics.median(timings) * 1000
+
+    print(f"import of the actions package over {args.runs} runs")
+    print(f"median {median_ms:.0f} ms, min {min(timings) * 1000:.0f} ms, "
+          f"max {max(timings) * 1000:.0f} ms")
+
+    print(f"\n{'package':<40} {'self ms':>14}")
+    packages = sorted(by_package(modules).items(), key=lambda item: -item[1])
+    for name, own in packages[: args.top]:
+        print(f"{name:<40} {own / 1000:>14.1f}")
+
+    print(f"\n{'module':<60} {'cumulative ms':>14}")
+    slowest = sorted(modules, key=lambda item: -item[2])
+    for name, _, cumulative in slowest[: args.top]:
+        print(f"{name:<60} {cumulative / 1000:>14.1f}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\nmedian import time exceeds {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Load test of the restaurant reservation ledger of `actions/reservations.py`.
+
+Simulates booking conversations that run concurrently in several worker
+processes with several threads each, like an action server with multiple
+workers. Every conversation asks for a random restaurant, opening slot in
+the next week and party size and, if the restaurant is full, tries the
+following free slots like `CheckRestaurantAvailability` does. Afterwards
+the ledger is replayed to verify that no restaurant was overbooked.
+
+Run from the root of the project:
+
+    python scripts/benchmark_reservations.py --conversations 5000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.check_restaurant_availability import (  # noqa: E402
+    ALTERNATIVE_CANDIDATES,
+    restaurant_calendars,
+)
+from actions.reservations import (  # noqa: E402
+    RESERVATION_DURATION,
+    ReservationLedger,
+    restaurant_capacities,
+)
+
+
+def book(ledger: ReservationLedger, conversation: int) -> Tuple[float, bool]:
+    rng = random.Random(conversation)
+    restaurant = rng.choice(sorted(ledger.capacities))
+    calendar = restaurant_calendars.calendar(restaurant)
+    requested = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(
+        hours=rng.randrange(7 * 24)
+    )
+    party_size = rng.randint(1, 8)
+
+    start = time.perf_counter()
+    slots = calendar.next_slots(requested, count=ALTERNATIVE_CANDIDATES)
+    booked = any(
+        ledger.reserve(
+            restaurant, slot, slot + RESERVATION_DURATION, party_size,
+            f"conversation-{conversation}",
+        )
+        for slot in slots
+    )
+    return time.perf_counter() - start, booked
+
+
+def worker(args: Tuple[str, List[int], int]) -> List[Tuple[float, bool]]:
+    path, conversations, threads = args
+    ledger = ReservationLedger(path, restaurant_capacities())
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda c: book(ledger, c), conversations))
+
+
+def overbooked_buckets(path: str) -> int:
+    ledger = ReservationLedger(path, restaurant_capacities())
+    seats: Dict[Tuple[str, int], int] = defaultdict(int)
+    for reservation in ledger.iter_reservations():
+        buckets = ledger._buckets(
+            datetime.fromisoformat(reservation.start),
+            datetime.fromisoformat(reservation.end),
+        )
+        for bucket in buckets:
+            seats[(reservation.restaurant, bucket)] += reservation.party_size
+    return sum(
+        1 for (restaurant, _), taken in seats.items()
+        if taken > ledger.capacities[restaurant]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "reservations.jsonl")
+        jobs = [
+            (path, list(range(i, args.conversations, args.workers)), args.threads)
+            for i in range(args.workers)
+        ]
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.workers) as pool:
+            results = [r for rs in pool.map(worker, jobs) for r in rs]
+        elapsed = time.perf_counter() - start
+        overbooked = overbooked_buckets(path)
+
+    latencies = sorted(latency for latency, _ in results)
+    booked = sum(1 for _, success in results if success)
+    print(f"conversations      {len(results)}")
+    print(f"booked             {booked}")
+    print(f"conversations/s    {len(results) / elapsed:.0f}")
+    print(f"mean latency (ms)  {statistics.mean(latencies) * 1000:.2f}")
+    print(f"p99 latency (ms)   {latencies[int(len(latencies) * 0.99)] * 1000:.2f}")
+    print(f"overbooked buckets {overbooked}")
+    sys.exit(1 if overbooked else 0)
+
+
+if __name__ == "__main__":
+    main()
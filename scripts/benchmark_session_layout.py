@@ -0,0 +1,79 @@
+"""Measures session directory creation and lookup for flat and sharded layouts.
+
+For every session count, the benchmark creates one directory per session with
+the layout of the JSON session store and then looks up a random sample of
+them, the way the store does when a session is accessed.
+
+    python scripts/benchmark_session_layout.py --sessions 1000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.storage import JsonSessionStore  # noqa: E402
+
+
+def benchmark(root: str, depth: int, sessions: int, lookups: int) -> None:
+    store = JsonSessionStore(root, shard_depth=depth)
+    session_ids = [f"sender-{i}" for i in range(sessions)]
+
+    start = time.perf_counter()
+    for session_id in session_ids:
+        os.makedirs(store.get_session_db_path(session_id))
+    created = time.perf_counter() - start
+
+    sample = random.choices(session_ids, k=lookups)
+    start = time.perf_counter()
+    for session_id in sample:
+        os.stat(store.get_session_db_path(session_id))
+    looked_up = time.perf_counter() - start
+
+    missing = [f"unknown-{i}" for i in range(lookups)]
+    start = time.perf_counter()
+    for session_id in missing:
+        os.path.exists(store.get_session_db_path(session_id))
+    looked_up_missing = time.perf_counter() - start
+
+    print(
+        f"{sessions:>9} {depth:>5} "
+        f"{created / sessions * 1e6:>12.1f} "
+        f"{looked_up / lookups * 1e6:>12.1f} "
+        f"{looked_up_missing / lookups * 1e6:>14.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sessions", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument(
+        "--workdir", default=None,
+        help="Directory on the file system to benchmark, defaults to a temp dir.",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'sessions':>9} {'depth':>5} {'create (us)':>12} "
+        f"{'lookup (us)':>12} {'missing (us)':>14}"
+    )
+    for sessions in args.sessions:
+        for depth in args.depths:
+            root = tempfile.mkdtemp(dir=args.workdir)
+            try:
+                benchmark(root, depth, sessions, args.lookups)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Compares the search latency of the in-memory store with Qdrant on `docs/`.
+
+Chunks the documents like `InMemory_Store` in `addons/in_memory.py` does,
+embeds them once and loads the same vectors into a `VectorIndex` and into a
+Qdrant collection, queried through the langchain client used by
+`Qdrant_Store`. The queries are the questions of the FAQ documents, embedded
+up front, so only the vector search is measured. Qdrant runs in-process
+(`:memory:`) by default; pass `--qdrant-url` to measure a Qdrant server,
+which adds the network round trip a deployment pays. Also reports how often
+both stores return the same top result.
+
+Run from the root of the project, with the dependencies of the Qdrant
+addon installed:
+
+    python scripts/benchmark_vector_stores.py --qdrant-url http://localhost:6333
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.embeddings import HuggingFaceEmbeddings  # noqa: E402
+from langchain.vectorstores.qdrant import Qdrant  # noqa: E402
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+from addons.in_memory import VectorIndex, load_documents  # noqa: E402
+from addons.qdrant import SEARCH_RESULTS  # noqa: E402
+
+
+def faq_questions(docs_folder: str) -> List[str]:
+    questions = []
+    for name in sorted(os.listdir(docs_folder)):
+        with open(os.path.join(docs_folder, name), encoding="utf-8") as f:
+            questions.extend(re.findall(r"^Q: (.+)$", f.read(), re.MULTILINE))
+    return questions
+
+
+async def measure(
+    search: Callable[[List[float]], Awaitable[Any]], vectors: List[List[float]], rounds: int
+) -> List[float]:
+    # one warm-up pass, then the latency of every search in ms
+    for vector in vectors:
+        await search(vector)
+    latencies = []
+    for _ in range(rounds):
+        for vector in vectors:
+            start = time.perf_counter()
+            await search(vector)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    return sorted(latencies)[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+async def run(args: argparse.Namespace) -> None:
+    embeddings = HuggingFaceEmbeddings(
+        model_name=args.model,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": True},
+    )
+    documents = load_documents(args.docs, args.chunk_size, args.chunk_overlap)
+    vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+    questions = faq_questions(args.docs)
+    query_vectors = embeddings.embed_documents(questions)
+    print(f"{len(documents)} chunks, {len(questions)} queries, k={SEARCH_RESULTS}")
+
+    index = VectorIndex(documents, vectors)
+
+    collection = f"benchmark-{uuid.uuid4().hex[:8]}"
+    client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(":memory:")
+    client.create_collection(
+        collection,
+        vectors_config=models.VectorParams(size=len(vectors[0]), distance=models.Distance.COSINE),
+    )
+    client.upsert(
+        collection,
+        points=[
+            models.PointStruct(
+                id=i,
+                vector=vector,
+                payload={"page_content": doc.page_content, "metadata": doc.metadata},
+            )
+            for i, (doc, vector) in enumerate(zip(documents, vectors))
+        ],
+    )
+    # the payload keys of the `vector_store` section in endpoints.yml
+    qdrant = Qdrant(
+        client=client,
+        collection_name=collection,
+        embeddings=embeddings,
+        content_payload_key="page_content",
+        metadata_payload_key="metadata",
+    )
+
+    async def search_in_memory(vector: List[float]) -> Any:
+        return index.search(vector, SEARCH_RESULTS)
+
+    async def search_qdrant(vector: List[float]) -> Any:
+        return await qdrant.asimilarity_search_by_vector(vector, k=SEARCH_RESULTS)
+
+    try:
+        print(f"{'store':<12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+        for name, search in (("in-memory", search_in_memory), ("qdrant", search_qdrant)):
+            latencies = await measure(search, query_vectors, args.rounds)
+            print(
+                f"{name:<12} {statistics.median(latencies):>10.3f} "
+                f"{percentile(latencies, 0.95):>10.3f} {percentile(latencies, 0.99):>10.3f} "
+                f"{statistics.mean(latencies):>10.3f}"
+            )
+
+        same = 0
+        for vector in query_vectors:
+            in_memory_top = index.search(vector, 1)[0][0].page_content
+            qdrant_top = (await search_qdrant(vector))[0].page_content
+            same += in_memory_top == qdrant_top
+        print(f"same top result for {same} of {len(query_vectors)} queries")
+    finally:
+        client.delete_collection(collection)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", default="docs")
+    parser.add_argument("--model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--rounds", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Compares the local datetime parser with Duckling.
+
+The corpus consists of the user messages of the end-to-end tests in
+`e2e_tests` that answer a question for a date or time slot, or that look
+like a date or time expression, together with a few common phrases. Every
+expression is parsed by `actions/local_datetime_parser.py` and by the
+Duckling server configured in `RASA_DUCKLING_HTTP_URL`. Expressions that
+the local parser accepts have to resolve to the same value as in Duckling.
+Expressions it rejects are passed on to Duckling in production and are
+only listed.
+
+Run from the root of the project with a running Duckling server:
+
+    python scripts/check_datetime_conformance.py
+
+`--record` saves the values Duckling returned, together with the reference
+time and timezone they were resolved against. `--fixture` replays such a
+recording instead of calling Duckling, which is how
+`tests/fixtures/duckling_conformance.json` is checked in
+`tests/actions/test_datetime_conformance.py`. Re-record it after changing
+the grammar of the local parser:
+
+    python scripts/check_datetime_conformance.py --timezone Europe/Berlin \
+        --reference-time 2024-03-13T15:20:45+01:00 \
+        --record tests/fixtures/duckling_conformance.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.datetime_parsing import duckling_entity, reference_time  # noqa: E402
+from actions.entity_extractor import duckling_config  # noqa: E402
+from actions.local_datetime_parser import parse_local_datetime  # noqa: E402
+
+DATETIME_SLOTS = {
+    "appointment_time",
+    "book_restaurant_date",
+    "book_restaurant_time",
+    "recurrent_payment_end_date",
+    "recurrent_payment_start_date",
+}
+DATETIME_LIKE = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|noon|(mon|tues?|wed(nes)?|thu(rs)?|fri|"
+    r"satur|sun)(day)?|jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|dec|"
+    r"\d{1,2}\s*(am|pm)|\d{1,2}:\d{2})\b",
+    re.IGNORECASE,
+)
+COMMON_PHRASES = [
+    "today", "tomorrow", "tomorrow 7pm", "next friday", "in 2 hours",
+    "in a week", "friday at noon", "19:30", "the 1st of march",
+    # where Duckling is surprising, relative to a Wednesday in March
+    "wednesday", "next wednesday", "wednesday at 9am", "next wednesday at 6pm",
+    "march 12", "january 5", "in 30 minutes", "in 3 days", "9:30 am",
+]
+
+
+def _asked_slots(step: Dict[str, Any]) -> Set[str]:
+    utterances = [step.get("utter", "")] + [
+        (assertion.get("bot_uttered") or {}).get("utter_name", "")
+        for assertion in step.get("assertions") or []
+    ]
+    return {u[len("utter_ask_"):] for u in utterances if u} & DATETIME_SLOTS
+
+
+def _set_slots(step: Dict[str, Any]) -> Set[str]:
+    slots = []
+    for assertion in step.get("assertions") or []:
+        slots.extend(slot.get("name") for slot in assertion.get("slot_was_set") or [])
+    return set(slots) & DATETIME_SLOTS
+
+
+def e2e_corpus(directory: str = "e2e_tests") -> Iterator[str]:
+    for path in glob.glob(os.path.join(directory, "**", "*.yml"), recursive=True):
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        if not isinstance(data, dict):
+            continue
+        for test_case in data.get("test_cases") or []:
+            asked = False
+            for step in test_case.get("steps") or []:
+                text = step.get("user")
+                if isinstance(text, str) and (
+                    asked or _set_slots(step) or DATETIME_LIKE.search(text)
+                ):
+                    yield text
+                asked = bool(_asked_slots(step))
+
+
+def _value(entity: Optional[Dict[str, Any]]) -> Optional[str]:
+    if entity is None:
+        return None
+    value = entity["value"]
+    return value["from"] if isinstance(value, dict) else value
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(
+    path: str, reference: datetime, timezone: Optional[str], values: Dict[str, Optional[str]]
+) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "reference_time": reference.isoformat(),
+                "timezone": timezone,
+                "duckling": dict(sorted(values.items())),
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default="e2e_tests")
+    parser.add_argument("--timezone", default=duckling_config.get("timezone"))
+    parser.add_argument(
+        "--reference-time", default=None, help="ISO timestamp, the current time by default"
+    )
+    parser.add_argument("--record", default=None, help="writes the Duckling values to a file")
+    parser.add_argument("--fixture", default=None, help="replays recorded Duckling values")
+    args = parser.parse_args()
+    if args.record and args.fixture:
+        parser.error("--record needs Duckling, it cannot replay a --fixture")
+
+    corpus: List[str] = sorted(set(e2e_corpus(args.corpus)) | set(COMMON_PHRASES))
+    recorded: Optional[Dict[str, Optional[str]]] = None
+    if args.fixture:
+        fixture = load_fixture(args.fixture)
+        args.timezone = fixture["timezone"]
+        args.reference_time = fixture["reference_time"]
+        recorded = fixture["duckling"]
+    # the extractor is created on first use, with the timezone to resolve in
+    duckling_config["timezone"] = args.timezone
+    if args.reference_time:
+        reference = datetime.fromisoformat(args.reference_time)
+        if args.timezone:
+            reference = reference.astimezone(ZoneInfo(args.timezone))
+    else:
+        reference = reference_time()
+
+    values: Dict[str, Optional[str]] = {}
+    mismatches = 0
+    rejected = 0
+    missing = 0
+    print(f"{'expression':<50} {'local':<30} {'duckling':<30}")
+    for text in corpus:
+        local = _value(parse_local_datetime(text, reference))
+        if recorded is None:
+            duckling = values[text] = _value(duckling_entity(text, reference))
+        elif text in recorded:
+            duckling = recorded[text]
+        else:
+            duckling = None
+        if local is None:
+            rejected += 1
+            status = ""
+        elif recorded is not None and text not in recorded:
+            missing += 1
+            status = "not recorded"
+        elif local == duckling:
+            status = "ok"
+        else:
+            mismatches += 1
+            status = "MISMATCH"
+        print(f"{text[:50]:<50} {local or '-':<30} {duckling or '-':<30} {status}")
+
+    print(
+        f"\n{len(corpus)} expressions, {len(corpus) - rejected} parsed locally, "
+        f"{mismatches} mismatches"
+        + (f", {missing} not recorded" if missing else "")
+    )
+    if args.record:
+        save_fixture(args.record, reference, args.timezone, values)
+        print(f"recorded {len(values)} Duckling values in {args.record}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
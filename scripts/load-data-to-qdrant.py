@@ -2,11 +2,16 @@ from datasets import load_dataset
 from langchain.schema import Document
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores.qdrant import Qdrant
+from qdrant_client import models
 import logging
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# the name the assistant searches, an alias of the latest ingestion
+COLLECTION_ALIAS = "squad"
+
 def dataset_to_documents(dataset):
     documents = []
     for i in range(len(dataset)):
@@ -32,13 +37,38 @@ def load_dataset_to_qdrant(dataset_name):
     logger.info(f"✅ Embeddings")
 
     docs = dataset_to_documents(squad['train'])
-    return Qdrant.from_documents(
+    # every ingestion gets a new collection, so that the search cache of
+    # the assistant notices it even if the number of points is unchanged
+    qdrant = Qdrant.from_documents(
         docs,
         embeddings,
         host="localhost",
         prefer_grpc=True, 
-        collection_name="squad",
+        collection_name=f"{COLLECTION_ALIAS}-{int(time.time())}",
     )
+    point_alias_to(qdrant.client, qdrant.collection_name)
+    return qdrant
+
+def point_alias_to(client, collection_name):
+    previous = [
+        alias.collection_name
+        for alias in client.get_aliases().aliases
+        if alias.alias_name == COLLECTION_ALIAS
+    ]
+    operations = [
+        models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=COLLECTION_ALIAS))
+    ] if previous else []
+    if any(c.name == COLLECTION_ALIAS for c in client.get_collections().collections):
+        # loaded by an earlier version of this script, without an alias
+        client.delete_collection(COLLECTION_ALIAS)
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=collection_name, alias_name=COLLECTION_ALIAS)
+    ))
+    # switches atomically, searches never see a missing collection
+    client.update_collection_aliases(change_aliases_operations=operations)
+    for name in previous:
+        client.delete_collection(name)
+    logger.info(f"✅ Alias {COLLECTION_ALIAS} -> {collection_name}")
 
 if __name__ == "__main__":
     qdrant = load_dataset_to_qdrant("rajpurkar/squad")
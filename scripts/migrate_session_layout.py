@@ -0,0 +1,31 @@
+"""Moves the stored sessions of the JSON backend to another shard depth.
+
+Sessions used to be stored as siblings directly in the session root, which
+corresponds to a shard depth of 0. Stop the action server before running:
+
+    python scripts/migrate_session_layout.py --from-depth 0 --to-depth 2
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.storage import DB_SESSION_ROOT, DB_SHARD_DEPTH, JsonSessionStore  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", default=DB_SESSION_ROOT)
+    parser.add_argument("--from-depth", type=int, default=0)
+    parser.add_argument("--to-depth", type=int, default=DB_SHARD_DEPTH)
+    args = parser.parse_args()
+
+    store = JsonSessionStore(args.root, shard_depth=args.to_depth)
+    moved = store.migrate_layout(args.from_depth)
+    print(f"Moved {moved} sessions in '{args.root}' to a shard depth of {args.to_depth}.")
+
+
+if __name__ == "__main__":
+    main()
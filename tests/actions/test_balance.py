@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from actions import db
+from actions.storage import BALANCE_SNAPSHOTS, TRANSACTIONS, JsonSessionStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "_session_store", None)
+    monkeypatch.setattr(db, "DB_BALANCE_SNAPSHOT_INTERVAL", 3)
+    store = JsonSessionStore(str(tmp_path / "sessions"))
+    db.set_session_store(store)
+    yield store
+    store.close()
+    db.session_cache.clear()
+
+
+def add(session_id, when, amount, sender="self", recipient="someone"):
+    db.add_transaction(session_id, db.Transaction(
+        datetime=when.isoformat(),
+        recipient=recipient,
+        sender=sender,
+        amount=amount,
+        description="test",
+    ))
+
+
+def test_balance_at_a_point_in_time_uses_the_snapshots(store):
+    start = max(
+        db._parse_datetime(row["datetime"]) for row in db.read_db("s", TRANSACTIONS)
+    ) + timedelta(days=1)
+    opening = db.get_balance("s")
+    changes = []
+    for day in range(10):
+        if day % 2:
+            add("s", start + timedelta(days=day), "12.50", sender="someone", recipient="self")
+            changes.append(12.5)
+        else:
+            add("s", start + timedelta(days=day), "5")
+            changes.append(-5)
+
+    assert len(db.read_db("s", BALANCE_SNAPSHOTS)) >= 3
+    assert db.get_balance("s") == pytest.approx(opening + sum(changes))
+    for day in range(10):
+        # halfway through the day of the transaction
+        at = start + timedelta(days=day, hours=12)
+        assert db.get_balance("s", at) == pytest.approx(opening + sum(changes[: day + 1]))
+    assert db.get_balance("s", start - timedelta(hours=1)) == pytest.approx(opening)
+
+
+def test_balance_keeps_cents_and_whole_amounts(store):
+    opening = db.get_balance("s")
+    add("s", datetime.now(), "0.10")
+    add("s", datetime.now(), "0.20")
+
+    assert db.get_balance("s") == db.money(opening - 0.3)
+    add("s", datetime.now(), "0.70")
+    assert db.get_balance("s") == opening - 1
+    assert isinstance(db.get_balance("s"), type(opening))
@@ -0,0 +1,37 @@
+import json
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from actions.local_datetime_parser import parse_local_datetime
+
+# recorded with `scripts/check_datetime_conformance.py --record`
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "fixtures", "duckling_conformance.json")
+
+with open(FIXTURE, encoding="utf-8") as f:
+    RECORDING = json.load(f)
+
+NOW = datetime.fromisoformat(RECORDING["reference_time"]).astimezone(
+    ZoneInfo(RECORDING["timezone"])
+)
+
+
+# the expressions the local parser rejects are passed on to Duckling
+PARSED = {
+    text: (entity["value"], RECORDING["duckling"][text])
+    for text in sorted(RECORDING["duckling"])
+    for entity in [parse_local_datetime(text, NOW)]
+    if entity is not None
+}
+
+
+def test_most_recorded_expressions_are_parsed_locally():
+    assert len(PARSED) > len(RECORDING["duckling"]) // 2
+
+
+@pytest.mark.parametrize("text", list(PARSED))
+def test_local_parser_agrees_with_the_recorded_duckling_values(text):
+    local, duckling = PARSED[text]
+    assert local == duckling
@@ -0,0 +1,67 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from actions.local_datetime_parser import parse_local_datetime
+
+BERLIN = ZoneInfo("Europe/Berlin")
+# a Wednesday afternoon
+NOW = datetime(2024, 3, 13, 15, 20, 45, tzinfo=BERLIN)
+# the last day of the year, a Tuesday
+NEW_YEARS_EVE = datetime(2024, 12, 31, 22, 0, tzinfo=BERLIN)
+
+
+def value(text, now=NOW):
+    entity = parse_local_datetime(text, now)
+    assert entity is not None, text
+    return entity["value"], entity["additional_info"]["grain"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("today", ("2024-03-13T00:00:00.000+01:00", "day")),
+        ("Tomorrow", ("2024-03-14T00:00:00.000+01:00", "day")),
+        ("yesterday", ("2024-03-12T00:00:00.000+01:00", "day")),
+        ("the day after tomorrow", ("2024-03-15T00:00:00.000+01:00", "day")),
+        ("friday", ("2024-03-15T00:00:00.000+01:00", "day")),
+        ("on wednesday", ("2024-03-20T00:00:00.000+01:00", "day")),
+        ("next friday", ("2024-03-15T00:00:00.000+01:00", "day")),
+        ("next wednesday", ("2024-03-20T00:00:00.000+01:00", "day")),
+        ("march 20th", ("2024-03-20T00:00:00.000+01:00", "day")),
+        ("1st of march", ("2024-03-01T00:00:00.000+01:00", "day")),
+        ("january 5", ("2025-01-05T00:00:00.000+01:00", "day")),
+        ("5 April 2026", ("2026-04-05T00:00:00.000+02:00", "day")),
+        ("at 7pm", ("2024-03-13T19:00:00.000+01:00", "hour")),
+        ("9:30 am", ("2024-03-14T09:30:00.000+01:00", "minute")),
+        ("noon", ("2024-03-14T12:00:00.000+01:00", "hour")),
+        ("18:45", ("2024-03-13T18:45:00.000+01:00", "minute")),
+        ("tomorrow at 8pm", ("2024-03-14T20:00:00.000+01:00", "hour")),
+        ("7:30pm next monday", ("2024-03-18T19:30:00.000+01:00", "minute")),
+        ("wednesday at 9am", ("2024-03-13T09:00:00.000+01:00", "hour")),
+        ("next wednesday at 6pm", ("2024-03-20T18:00:00.000+01:00", "hour")),
+        ("in 30 minutes", ("2024-03-13T15:50:45.000+01:00", "second")),
+        ("in 2 hours", ("2024-03-13T17:20:00.000+01:00", "minute")),
+        ("in 3 days", ("2024-03-16T15:00:00.000+01:00", "hour")),
+        ("in a week", ("2024-03-20T00:00:00.000+01:00", "day")),
+    ],
+)
+def test_parses_against_a_fixed_reference_time(text, expected):
+    assert value(text) == expected
+
+
+def test_days_and_times_roll_over_the_end_of_the_year():
+    assert value("tomorrow", NEW_YEARS_EVE) == ("2025-01-01T00:00:00.000+01:00", "day")
+    assert value("at 9am", NEW_YEARS_EVE) == ("2025-01-01T09:00:00.000+01:00", "hour")
+    assert value("january 5", NEW_YEARS_EVE) == ("2025-01-05T00:00:00.000+01:00", "day")
+    # the current month is not over yet
+    assert value("december 24", NEW_YEARS_EVE) == ("2024-12-24T00:00:00.000+01:00", "day")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["at 7", "7:30", "tonight", "25:00", "13pm", "february 30", "sometime next week", ""],
+)
+def test_leaves_ambiguous_or_unknown_expressions_to_duckling(text):
+    assert parse_local_datetime(text, NOW) is None
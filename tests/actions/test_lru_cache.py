@@ -0,0 +1,24 @@
+from actions.action_cache import LRUCache
+
+MISSING = object()
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b", MISSING) is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_a_cached_none_is_a_hit():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", None)
+
+    assert cache.get("a", MISSING) is None
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from actions.reservations import ReservationLedger
+
+# on the hour, like the opening slots, so that windows fill whole buckets
+START = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+END = START + timedelta(hours=2)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "reservations.jsonl")
+
+
+def ledger(path):
+    return ReservationLedger(path, {"Pasta Place": 6})
+
+
+def test_reserve_stops_at_the_capacity(path):
+    reservations = ledger(path)
+
+    assert reservations.reserve("Pasta Place", START, END, 4, "a")
+    assert not reservations.reserve("Pasta Place", START, END, 4, "b")
+    assert reservations.reserve("Pasta Place", START, END, 2, "b")
+    assert reservations.free_seats("Pasta Place", START, END) == 0
+    # after the first window the seats are free again
+    assert reservations.reserve("Pasta Place", END, END + timedelta(hours=2), 6, "c")
+
+
+def test_reserving_again_replaces_the_table_of_the_session(path):
+    reservations = ledger(path)
+    assert reservations.reserve("Pasta Place", START, END, 4, "a")
+
+    assert reservations.has_capacity("Pasta Place", START, END, 6, "a")
+    assert reservations.reserve("Pasta Place", START, END, 6, "a")
+    assert [r.party_size for r in reservations.iter_reservations()] == [6]
+
+
+def test_release_frees_the_seats_for_other_workers(path):
+    reservations, other_worker = ledger(path), ledger(path)
+    assert reservations.reserve("Pasta Place", START, END, 6, "a")
+    assert not other_worker.has_capacity("Pasta Place", START, END, 1)
+
+    assert reservations.release("a") == 1
+    assert reservations.release("a") == 0
+    assert other_worker.free_seats("Pasta Place", START, END) == 6
+
+
+def test_compact_keeps_only_the_held_reservations(path):
+    reservations, other_worker = ledger(path), ledger(path)
+    for session_id in "abc":
+        assert reservations.reserve("Pasta Place", START, END, 2, session_id)
+    reservations.release("b")
+    # a later booking of the same session replaces the earlier one
+    assert reservations.reserve("Pasta Place", START, END, 1, "c")
+    assert other_worker.free_seats("Pasta Place", START, END) == 3
+
+    reservations.compact()
+
+    with open(path) as f:
+        assert len(f.readlines()) == 2
+    # the other worker notices the replaced file and reads it from the start
+    assert other_worker.free_seats("Pasta Place", START, END) == 3
+    assert other_worker.reserve("Pasta Place", START, END, 3, "d")
+    assert reservations.free_seats("Pasta Place", START, END) == 0
@@ -0,0 +1,23 @@
+from actions.db import SessionCache
+
+
+def test_extend_does_not_change_the_list_of_earlier_readers():
+    cache = SessionCache(max_sessions=4, max_bytes=1024)
+    cache.put("s", "rows", [1, 2], size=2, stamp=1)
+    rows = cache.get("s", "rows", stamp=1)
+
+    cache.extend("s", "rows", [3], size=1, previous_stamp=1, stamp=2)
+
+    assert rows == [1, 2]
+    assert cache.get("s", "rows", stamp=2) == [1, 2, 3]
+
+
+def test_extend_drops_an_outdated_entry():
+    cache = SessionCache(max_sessions=4, max_bytes=1024)
+    cache.put("s", "rows", [1, 2], size=2, stamp=1)
+
+    cache.extend("s", "rows", [3], size=1, previous_stamp=5, stamp=6)
+
+    assert cache.get("s", "rows", stamp=1) is None
+    assert cache.get("s", "rows", stamp=6) is None
+    assert cache.stats()["bytes"] == 0
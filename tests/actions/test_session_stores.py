@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from actions.sqlite_storage import SqliteSessionStore
+from actions.storage import BALANCE, TRANSACTIONS, JsonSessionStore
+
+WRITERS = 4
+WRITES_PER_WRITER = 25
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def make_store(request, tmp_path):
+    """Creates one store per writer, like separate worker processes would."""
+    stores = []
+
+    def make():
+        if request.param == "json":
+            store = JsonSessionStore(str(tmp_path / "sessions"))
+        else:
+            store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"))
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def transaction(writer, index):
+    return {
+        "datetime": f"2024-01-01T00:00:{index:02d}",
+        "recipient": f"writer {writer}",
+        "sender": "self",
+        "amount": "1",
+        "description": f"{writer}-{index}",
+    }
+
+
+def run_writers(target):
+    errors = []
+
+    def run(writer):
+        try:
+            target(writer)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(w,)) for w in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_concurrent_appends_keep_every_row(make_store):
+    def append(writer):
+        store = make_store()
+        for index in range(WRITES_PER_WRITER):
+            store.append("s", TRANSACTIONS, transaction(writer, index))
+
+    seed_rows = len(make_store().read("s", TRANSACTIONS))
+    run_writers(append)
+
+    rows = make_store().read("s", TRANSACTIONS)
+    added = [row["description"] for row in rows[seed_rows:]]
+    assert sorted(added) == sorted(
+        f"{w}-{i}" for w in range(WRITERS) for i in range(WRITES_PER_WRITER)
+    )
+
+
+def test_concurrent_apply_under_the_session_lock_loses_no_update(make_store):
+    def apply(writer):
+        store = make_store()
+        for index in range(WRITES_PER_WRITER):
+            with store.lock("s"):
+                balance = dict(store.read("s", BALANCE))
+                balance["transactions"] += 1
+                store.apply(
+                    "s", {BALANCE: balance}, {TRANSACTIONS: [transaction(writer, index)]}
+                )
+
+    store = make_store()
+    transactions = store.read("s", BALANCE)["transactions"]
+    seed_rows = len(store.read("s", TRANSACTIONS))
+    run_writers(apply)
+
+    store = make_store()
+    total = WRITERS * WRITES_PER_WRITER
+    assert store.read("s", BALANCE)["transactions"] == transactions + total
+    assert len(store.read("s", TRANSACTIONS)) == seed_rows + total
@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from addons.embedding_cache import CachedEmbeddings, DiskEmbeddingStore, text_key  # noqa: E402
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 1.0, 0.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def test_overwritten_slot_returns_the_new_vector_only(tmp_path):
+    # a single slot, every key collides
+    store = DiskEmbeddingStore(str(tmp_path / "store"), 3, capacity=1)
+    first, second = text_key("first"), text_key("second")
+    store.put(first, [1.0, 1.0, 1.0])
+    store.put(second, [2.0, 2.0, 2.0])
+
+    assert store.get(first) is None
+    assert store.get(second) == [2.0, 2.0, 2.0]
+
+
+def test_slot_overwritten_while_read_is_a_miss(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path / "store"), 3, capacity=1)
+    first, second = text_key("first"), text_key("second")
+    store.put(first, [1.0, 1.0, 1.0])
+
+    class OverwritingVectors:
+        """Lets another writer take the slot after the reader matched its key."""
+
+        def __init__(self, vectors):
+            self.vectors = vectors
+
+        def __getitem__(self, slot):
+            store.vectors = self.vectors
+            store.put(second, [2.0, 2.0, 2.0])
+            return self.vectors[slot]
+
+    store.vectors = OverwritingVectors(store.vectors)
+    assert store.get(first) is None
+    assert store.get(second) == [2.0, 2.0, 2.0]
+
+
+def test_vectors_are_shared_through_the_disk_tier(tmp_path):
+    embeddings = CountingEmbeddings()
+    cache = CachedEmbeddings(embeddings, path=str(tmp_path), namespace="test")
+    vector = cache.embed_query("hello")
+
+    other = CachedEmbeddings(embeddings, path=str(tmp_path), namespace="test")
+    assert other.embed_query("hello") == vector
+    assert embeddings.calls == 1
+    assert other.stats()["disk_hits"] == 1